@@ -0,0 +1,247 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from alarms import AlarmEngine
+from capture import CaptureSink
+from metrics import METRICS
+from publisher import Publisher
+from recorder import CsvSink, Recorder
+from serial_reader import SampleQueue
+from session_manager import SessionManager
+from stream_stats import RunningStats, make_filter
+from timestamps import SessionClock
+
+# Everything between the serial ports and the disk: opening ports, parsing,
+# calibration, timestamping and recording. Nothing here imports Qt or
+# matplotlib, so the GUI and the headless CLI share the same code path.
+
+RECORDING_DIR = os.path.join(os.path.expanduser('~'), 'TemperaturePlayground', 'recordings')
+
+
+def default_recording_name(extension=CaptureSink.extension):
+    return f"temperature_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+
+
+def sink_for_path(path):
+    return CsvSink if path.lower().endswith(CsvSink.extension) else CaptureSink
+
+
+def jitter_summary(jitter):
+    # Sample interval statistics of a port in ms, or None before two samples
+    if not jitter.count:
+        return None
+    return {'mean': round(jitter.mean * 1000, 3), 'stdev': round(jitter.stdev * 1000, 3),
+            'min': round(jitter.min * 1000, 3), 'max': round(jitter.max * 1000, 3)}
+
+
+class Acquisition:
+    def __init__(self, queue_size=65536, record_filter='none', reconnect=True):
+        self.queue = SampleQueue(queue_size)
+        self.manager = None
+        # Lost ports are reopened in the background and the session goes on;
+        # see session_manager.Reconnector
+        self.reconnect = reconnect
+        self.clock = SessionClock()
+        # Recordings go straight to disk; no copy of the session is kept
+        self.recorder = None
+        self.collecting = False
+        # Filter applied per channel before samples are recorded and handed
+        # to the caller; see stream_stats.FILTERS
+        make_filter(record_filter)
+        self.record_filter = record_filter
+        self._filters = {}
+        # Running min/mean/max/rate per channel since connect or start
+        self.stats = {}
+        # Rules and actions can be changed at any time
+        self.alarms = AlarmEngine()
+        # Optional live feed for other processes; see start_publisher
+        self.publisher = None
+
+    @property
+    def connected(self):
+        return self.manager is not None
+
+    @property
+    def readers(self):
+        return self.manager.readers if self.manager is not None else {}
+
+    def connect(self, port, baudrate, calibration_offset=0.0, parser=None, start=True):
+        # Opens the first port and starts the I/O thread; returns its channel.
+        # With start=False nothing is read until start_reading(), e.g. so a
+        # replay's first samples are not lost before the session starts.
+        self.queue.clear()
+        self.reset_stats()
+        manager = SessionManager(queue=self.queue, alarms=self.alarms, reconnect=self.reconnect)
+        channel = manager.add_port(port, baudrate, calibration_offset=calibration_offset, parser=parser)
+        self.manager = manager
+        if start:
+            self.start_reading()
+        return channel
+
+    def start_reading(self):
+        if self.manager is not None and not self.manager.is_alive():
+            self.manager.start()
+
+    def add_port(self, port, baudrate, calibration_offset=0.0, parser=None):
+        return self.manager.add_port(port, baudrate, calibration_offset=calibration_offset, parser=parser)
+
+    def set_calibration(self, channel, offset):
+        if self.manager is not None:
+            self.manager.set_calibration(channel, offset)
+
+    def take_failures(self):
+        return self.manager.take_failures() if self.manager is not None else []
+
+    def take_reconnects(self):
+        return self.manager.take_reconnects() if self.manager is not None else []
+
+    @property
+    def reconnecting(self):
+        return self.manager.reconnecting if self.manager is not None else []
+
+    def start_publisher(self, address, **options):
+        # Publishes every drained batch, collecting or not, until close()
+        self.stop_publisher()
+        self.publisher = Publisher(address, **options)
+        return self.publisher
+
+    def stop_publisher(self):
+        if self.publisher is not None:
+            self.publisher.stop()
+            self.publisher = None
+
+    def set_record_filter(self, name):
+        make_filter(name)
+        self.record_filter = name
+        self._filters = {}
+
+    def reset_stats(self):
+        self.stats = {}
+        for f in self._filters.values():
+            f.reset()
+
+    def disconnect(self):
+        if self.manager is not None:
+            self.manager.stop()
+            self.manager = None
+
+    def start_collecting(self, recording_path=None):
+        # Starts a new session, recording to recording_path when given; the
+        # file format follows its extension (.csv or .tpcap).
+        self.reset_stats()
+        self.clock.start()
+        self.recorder = None
+        if recording_path is not None:
+            directory = os.path.dirname(recording_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            sink = sink_for_path(recording_path)
+            if sink is CsvSink:
+                # The Alarm column also carries reconnect gap markers
+                sink_options = {'channels': len(self.readers) > 1, 'alarms': bool(self.alarms.rules) or self.reconnect}
+            else:
+                # Each port's settings, so a replay can undo its own calibration
+                sink_options = {'channels': {
+                    channel: {'port': reader.port, 'baudrate': reader.baudrate,
+                              'calibration_offset': reader.calibration_offset}
+                    for channel, reader in self.readers.items()}}
+            self.recorder = Recorder(recording_path, self.clock.start_epoch, sink=sink, **sink_options)
+        self.collecting = True
+
+    def stop_collecting(self):
+        # Finalizes the recording; returns its path, or None when nothing
+        # was recorded (an empty recording is deleted).
+        self.collecting = False
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        path = recorder.close()
+        if not recorder.samples_written:
+            os.remove(path)
+            return None
+        return path
+
+    def pump(self):
+        # Drains the sample queue. Samples taken during a collection are
+        # recorded and returned with their elapsed seconds; the rest
+        # come back with elapsed None. Returns [(elapsed, value, channel)].
+        samples = self.queue.drain()
+        if not samples:
+            return []
+        if METRICS.enabled:
+            # Age of the oldest sample by the time it left the queue
+            METRICS.observe('queue_lag_ms', (time.monotonic_ns() - samples[0][0]) / 1e6)
+        samples = self._filter_and_measure(samples)
+        if self.publisher is not None:
+            self.publisher.publish(samples)
+        if not self.collecting:
+            return [(None, value, channel) for _, value, channel, _ in samples]
+        clock = self.clock
+        start_ns = clock.start_ns
+        recorder = self.recorder
+        batch = []
+        for t_ns, value, channel, flags in samples:
+            if t_ns < start_ns:
+                # Read before the session started
+                batch.append((None, value, channel))
+                continue
+            elapsed = clock.elapsed(t_ns)
+            if recorder is not None:
+                recorder.append(elapsed, value, channel, flags)
+            batch.append((elapsed, value, channel))
+        return batch
+
+    def _filter_and_measure(self, samples):
+        # Batch path: filters and statistics run once per channel over the
+        # whole drain instead of once per sample
+        stamps, values, channels, flags = zip(*samples)
+        values = np.array(values, dtype=np.float64)
+        channels = np.array(channels)
+        times = np.array(stamps, dtype=np.int64)
+        single = channels[0] == channels[-1] and not (channels != channels[0]).any()
+        for channel in ([int(channels[0])] if single else np.unique(channels).tolist()):
+            index = slice(None) if single else channels == channel
+            f = self._filters.get(channel)
+            if f is None:
+                f = self._filters[channel] = make_filter(self.record_filter)
+            values[index] = f.filter_batch(values[index])
+            stats = self.stats.get(channel)
+            if stats is None:
+                stats = self.stats[channel] = RunningStats()
+            stats.update_batch(values[index], times[index] * 1e-9)
+        return list(zip(stamps, values.tolist(), channels.tolist(), flags))
+
+    def metrics_snapshot(self):
+        # METRICS plus the per-port counters, queue and recorder state
+        snapshot = METRICS.snapshot()
+        snapshot['ports'] = {
+            reader.port: {
+                'bytes': reader.framer.total_bytes,
+                'lines': reader.lines_read,
+                'unparsed': reader.lines_unparsed,
+                'out_of_range': reader.lines_out_of_range,
+                'overflows': reader.framer.overflows,
+                'lines_per_sec': round(reader.lines_per_sec, 1),
+                'bytes_per_sec': round(reader.bytes_per_sec, 1),
+                'reconnects': reader.reconnects,
+                'clock_resyncs': reader.device_clock.resyncs,
+                'interval_ms': jitter_summary(reader.jitter),
+            }
+            for reader in list(self.readers.values())
+        }
+        snapshot['queue'] = {'depth': self.queue.depth, 'dropped': self.queue.dropped}
+        recorder = self.recorder
+        if recorder is not None:
+            snapshot['recorder'] = {'backlog': recorder.backlog, 'written': recorder.samples_written}
+        if self.publisher is not None:
+            snapshot['publisher'] = self.publisher.stats()
+        return snapshot
+
+    def close(self):
+        path = self.stop_collecting() if self.collecting else None
+        self.disconnect()
+        self.stop_publisher()
+        return path
@@ -0,0 +1,325 @@
+import json
+import os
+import socket
+import subprocess
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+# Alarm rules evaluated by the I/O thread on every accepted sample, right
+# after parsing, so an alarm fires within one sample period. Each rule keeps
+# its own per-channel state and does a couple of comparisons per sample.
+#
+# Active alarms are also stored with the data: every sample carries a bit
+# mask of the rules active on its channel (the capture "flags" field, and an
+# Alarm column in CSV).
+
+FLAG_HIGH = 0x1
+FLAG_LOW = 0x2
+FLAG_SLOPE = 0x4
+# Set on the first sample after a stale period, i.e. there is a gap before it
+FLAG_STALE = 0x8
+# Set on the first sample after the port was lost and reopened
+FLAG_GAP = 0x10
+FLAG_NAMES = ((FLAG_HIGH, 'high'), (FLAG_LOW, 'low'), (FLAG_SLOPE, 'slope'), (FLAG_STALE, 'stale'), (FLAG_GAP, 'gap'))
+
+AlarmEvent = namedtuple('AlarmEvent', 'rule channel t_ns value active message')
+
+
+def flag_names(flags):
+    return '|'.join(name for flag, name in FLAG_NAMES if flags & flag)
+
+
+class Rule:
+    flag = 0
+    # Whether the sample that clears the alarm is flagged too (stale)
+    flag_on_clear = False
+
+    def __init__(self, channel=None, name=None):
+        # channel None applies the rule to every channel
+        self.channel = channel
+        self.name = name or self.kind
+        self.active = {}
+
+    def check(self, channel, t_ns, value):
+        # Returns (active, message) when the state changes, else None
+        return None
+
+    def describe(self):
+        return self.name
+
+
+class HighThreshold(Rule):
+    kind = 'high'
+    flag = FLAG_HIGH
+
+    def __init__(self, limit, hysteresis=0.5, channel=None, name=None):
+        super().__init__(channel, name)
+        self.limit = limit
+        self.hysteresis = hysteresis
+
+    def check(self, channel, t_ns, value):
+        if self.active.get(channel):
+            if value < self.limit - self.hysteresis:
+                self.active[channel] = False
+                return False, f'back below {self.limit:g} °C'
+        elif value > self.limit:
+            self.active[channel] = True
+            return True, f'above {self.limit:g} °C'
+        return None
+
+    def describe(self):
+        return f'> {self.limit:g} °C'
+
+
+class LowThreshold(Rule):
+    kind = 'low'
+    flag = FLAG_LOW
+
+    def __init__(self, limit, hysteresis=0.5, channel=None, name=None):
+        super().__init__(channel, name)
+        self.limit = limit
+        self.hysteresis = hysteresis
+
+    def check(self, channel, t_ns, value):
+        if self.active.get(channel):
+            if value > self.limit + self.hysteresis:
+                self.active[channel] = False
+                return False, f'back above {self.limit:g} °C'
+        elif value < self.limit:
+            self.active[channel] = True
+            return True, f'below {self.limit:g} °C'
+        return None
+
+    def describe(self):
+        return f'< {self.limit:g} °C'
+
+
+class SlopeLimit(Rule):
+    # |dT/dt| over the last `window` seconds above max_rate (°C/s). The
+    # window keeps single noisy samples from tripping it; the history is a
+    # deque trimmed from the left, so each sample costs O(1) amortized.
+    kind = 'slope'
+    flag = FLAG_SLOPE
+
+    def __init__(self, max_rate, window=1.0, hysteresis=0.1, channel=None, name=None):
+        super().__init__(channel, name)
+        self.max_rate = max_rate
+        self.window_ns = int(window * 1e9)
+        self.hysteresis = hysteresis
+        self._history = {}
+
+    def check(self, channel, t_ns, value):
+        history = self._history.get(channel)
+        if history is None:
+            history = self._history[channel] = deque()
+        history.append((t_ns, value))
+        # Keep exactly one sample at least a window old as the reference
+        while len(history) > 2 and t_ns - history[1][0] >= self.window_ns:
+            history.popleft()
+        t0, v0 = history[0]
+        if t_ns - t0 < self.window_ns:
+            return None
+        rate = abs(value - v0) * 1e9 / (t_ns - t0)
+        if self.active.get(channel):
+            if rate < self.max_rate - self.hysteresis:
+                self.active[channel] = False
+                return False, f'rate of change back under {self.max_rate:g} °C/s'
+        elif rate > self.max_rate:
+            self.active[channel] = True
+            return True, f'changing {rate:.2f} °C/s (limit {self.max_rate:g})'
+        return None
+
+    def describe(self):
+        return f'|dT/dt| > {self.max_rate:g} °C/s'
+
+
+class StaleSensor(Rule):
+    # No sample for `timeout` seconds; raised by AlarmEngine.tick, cleared by
+    # the next sample
+    kind = 'stale'
+    flag = FLAG_STALE
+    flag_on_clear = True
+
+    def __init__(self, timeout=5.0, channel=None, name=None):
+        super().__init__(channel, name)
+        self.timeout_ns = int(timeout * 1e9)
+
+    def check(self, channel, t_ns, value):
+        if self.active.get(channel):
+            self.active[channel] = False
+            return False, 'data again'
+        return None
+
+    def check_idle(self, channel, last_ns, now_ns):
+        if not self.active.get(channel) and now_ns - last_ns > self.timeout_ns:
+            self.active[channel] = True
+            return True, f'no data for {self.timeout_ns / 1e9:g} s'
+        return None
+
+    def describe(self):
+        return f'no data for {self.timeout_ns / 1e9:g} s'
+
+
+class AlarmEngine:
+    # Runs the rules for each sample and hands state changes to the actions.
+    # check() and tick() are called from the I/O thread; actions run there
+    # too and must return quickly. The GUI picks events up with
+    # take_events(), like SessionManager.take_failures().
+    def __init__(self, rules=(), actions=()):
+        self.rules = list(rules)
+        self.actions = list(actions)
+        self.labels = {}
+        self._events = deque(maxlen=1000)
+        self._last_ns = {}
+
+    def set_rules(self, rules):
+        self.rules = list(rules)
+
+    def watch(self, channel, label=None):
+        # Starts the stale timer for a channel that has not sent anything yet
+        self._last_ns[channel] = time.monotonic_ns()
+        if label is not None:
+            self.labels[channel] = label
+
+    def forget(self, channel):
+        self._last_ns.pop(channel, None)
+
+    def check(self, channel, t_ns, value):
+        # Returns the flag mask to store with this sample
+        self._last_ns[channel] = t_ns
+        flags = 0
+        for rule in self.rules:
+            if rule.channel is not None and rule.channel != channel:
+                continue
+            change = rule.check(channel, t_ns, value)
+            if change is not None:
+                self._emit(rule, channel, t_ns, value, *change)
+                if rule.flag_on_clear:
+                    flags |= rule.flag
+            if rule.active.get(channel):
+                flags |= rule.flag
+        return flags
+
+    def tick(self, now_ns=None):
+        # Time-based rules (stale sensors); called regularly by the I/O thread
+        now_ns = time.monotonic_ns() if now_ns is None else now_ns
+        for rule in self.rules:
+            if not isinstance(rule, StaleSensor):
+                continue
+            for channel, last_ns in list(self._last_ns.items()):
+                if rule.channel is not None and rule.channel != channel:
+                    continue
+                change = rule.check_idle(channel, last_ns, now_ns)
+                if change is not None:
+                    self._emit(rule, channel, now_ns, None, *change)
+
+    def _emit(self, rule, channel, t_ns, value, active, message):
+        label = self.labels.get(channel, f'channel {channel}')
+        event = AlarmEvent(rule, channel, t_ns, value, active, f'{label}: {message}')
+        self._events.append(event)
+        for action in self.actions:
+            try:
+                action(event)
+            except Exception:
+                # A broken action must not stop acquisition
+                pass
+
+    def take_events(self):
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    def active_alarms(self):
+        # [(rule, channel)] for everything currently raised
+        return [(rule, channel) for rule in self.rules for channel, active in list(rule.active.items()) if active]
+
+
+def rules_from_spec(spec):
+    # "high=80,low=5,slope=2,stale=10,hysteresis=0.5,window=1" -> rules
+    options = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f'Alarm settings are key=value pairs, got {item!r}')
+        options[key.strip()] = float(value)
+    unknown = set(options) - {'high', 'low', 'slope', 'stale', 'hysteresis', 'window'}
+    if unknown:
+        raise ValueError(f'Unknown alarm setting: {", ".join(sorted(unknown))}')
+    hysteresis = options.get('hysteresis', 0.5)
+    rules = []
+    if 'high' in options:
+        rules.append(HighThreshold(options['high'], hysteresis))
+    if 'low' in options:
+        rules.append(LowThreshold(options['low'], hysteresis))
+    if 'slope' in options:
+        rules.append(SlopeLimit(options['slope'], window=options.get('window', 1.0)))
+    if 'stale' in options:
+        rules.append(StaleSensor(options['stale']))
+    return rules
+
+
+def event_record(event):
+    return {
+        'time': datetime.now().isoformat(timespec='milliseconds'),
+        'alarm': event.rule.name,
+        'channel': event.channel,
+        'active': event.active,
+        'value': event.value,
+        'message': event.message,
+    }
+
+
+class LogAction:
+    # Appends one line per alarm change to a text file
+    def __init__(self, path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def __call__(self, event):
+        state = 'ALARM' if event.active else 'clear'
+        self.file.write(f'{datetime.now().strftime("%Y-%m-%d %H:%M:%S")} {state} {event.rule.name} {event.message}\n')
+        self.file.flush()
+
+
+class ShellAction:
+    # Runs a command per alarm change without waiting for it; the event is
+    # passed in ALARM_* environment variables
+    def __init__(self, command):
+        self.command = command
+        self._running = []
+
+    def __call__(self, event):
+        self._running = [p for p in self._running if p.poll() is None]
+        env = dict(os.environ)
+        env.update({
+            'ALARM_NAME': event.rule.name,
+            'ALARM_CHANNEL': str(event.channel),
+            'ALARM_ACTIVE': '1' if event.active else '0',
+            'ALARM_VALUE': '' if event.value is None else f'{event.value:.4f}',
+            'ALARM_MESSAGE': event.message,
+        })
+        self._running.append(subprocess.Popen(self.command, shell=True, env=env))
+
+
+class SocketAction:
+    # Sends each alarm change as a JSON datagram to a local UDP port (or a
+    # Unix datagram socket path); nothing waits on the receiver
+    def __init__(self, address):
+        if isinstance(address, int) or str(address).isdigit():
+            self.address = ('127.0.0.1', int(address))
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self.address = address
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def __call__(self, event):
+        try:
+            self.sock.sendto(json.dumps(event_record(event)).encode('utf-8'), self.address)
+        except OSError:
+            # Nobody listening
+            pass
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from temp_parser import PARSERS  # noqa: E402
+
+# Synthetic captures, one per line format the parsers are expected to handle
+CAPTURES = {
+    'temp': lambda t: f'temp: {t:.2f}'.encode('ascii'),
+    'celsius': lambda t: f'{t:.2f}°C'.encode('utf-8'),
+    'plain': lambda t: f'{t:.2f}'.encode('ascii'),
+    'csv': lambda t: f'{t:.2f},{t + 1.5:.2f},{t - 0.25:.2f}'.encode('ascii'),
+    'key=value': lambda t: f'hum=41.20 temp={t:.2f} p=1013.2'.encode('ascii'),
+}
+
+_LEGACY_PATTERN = r'(?:temp:?\s*)?(-?\d+\.?\d*)(?:\s*°?[Cc])?'
+
+
+def legacy_parser(line):
+    # The parser read_serial used before temp_parser existed, for reference
+    text = line.decode('ascii', errors='replace').strip()
+    matches = re.findall(_LEGACY_PATTERN, text)
+    if matches:
+        return float(matches[-1])
+    return None
+
+
+def make_capture(fmt, count, seed=0):
+    rng = random.Random(seed)
+    encode = CAPTURES[fmt]
+    return [encode(rng.uniform(-20.0, 80.0)) for _ in range(count)]
+
+
+def bench(parser, lines, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parser(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Measure lines/s for every registered line parser.')
+    ap.add_argument('--lines', type=int, default=100000, help='lines per synthetic capture')
+    ap.add_argument('--repeat', type=int, default=5, help='runs per case, best one is reported')
+    ap.add_argument('--json', action='store_true', help='print results as JSON')
+    args = ap.parse_args(argv)
+
+    parsers = dict(PARSERS)
+    parsers['legacy'] = legacy_parser
+    results = []
+    for fmt in CAPTURES:
+        lines = make_capture(fmt, args.lines)
+        for name, parser in parsers.items():
+            results.append({
+                'parser': name,
+                'capture': fmt,
+                'lines': args.lines,
+                'lines_per_sec': round(bench(parser, lines, args.repeat)),
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f'{"parser":<12} {"capture":<12} {"lines/s":>12}')
+        for r in results:
+            print(f'{r["parser"]:<12} {r["capture"]:<12} {r["lines_per_sec"]:>12,}')
+
+
+if __name__ == '__main__':
+    main()
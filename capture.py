@@ -0,0 +1,111 @@
+import csv
+import json
+import os
+import struct
+
+import numpy as np
+
+from sample_store import CSV_HEADER, CSV_CHANNEL_COLUMN, CSV_ALARM_COLUMN, csv_rows
+
+# Binary capture file (.tpcap): a fixed 128-byte header, a channel table and
+# packed little-endian records. Records are only ever appended, so a file cut
+# short by a crash is still readable up to its last complete record.
+MAGIC = b'TPCAP\r\n\x1a'
+VERSION = 2
+HEADER_SIZE = 128
+# magic, version, header size, record size, reserved, start epoch, baud rate,
+# calibration offset, port name; the last three describe the lowest channel.
+# From version 2 the header size includes a JSON table of every channel's
+# port, baud rate and calibration offset. A record's flags hold the
+# alarms.FLAG_* bits active when it was read.
+HEADER = struct.Struct('<8sHHHHdIxxxxd64s')
+RECORD_DTYPE = np.dtype([('t', '<f8'), ('value', '<f4'), ('channel', '<u2'), ('flags', '<u2')])
+
+
+class CaptureError(ValueError):
+    pass
+
+
+def write_header(fileobj, start_epoch, channels=None):
+    # channels maps channel -> {'port', 'baudrate', 'calibration_offset'}
+    channels = {int(channel): dict(info) for channel, info in (channels or {}).items()}
+    first = channels[min(channels)] if channels else {}
+    table = json.dumps({str(channel): info for channel, info in sorted(channels.items())}).encode('utf-8')
+    # Padded with spaces to keep records 8-byte aligned
+    header_size = HEADER_SIZE + -(-len(table) // 8) * 8
+    header = HEADER.pack(MAGIC, VERSION, header_size, RECORD_DTYPE.itemsize, 0, start_epoch,
+                         first.get('baudrate', 0), first.get('calibration_offset', 0.0),
+                         first.get('port', '').encode('utf-8')[:64])
+    fileobj.write(header.ljust(HEADER_SIZE, b'\0') + table.ljust(header_size - HEADER_SIZE))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+        if len(raw) < HEADER.size or raw[:8] != MAGIC:
+            raise CaptureError(f'{path} is not a capture file')
+        magic, version, header_size, record_size, _, start_epoch, baudrate, offset, port = HEADER.unpack_from(raw)
+        if version > VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise CaptureError(f'{path} uses an unsupported capture format (version {version})')
+        # Version 1 files only know the port they were started from
+        channels = {}
+        if version >= 2 and header_size > HEADER_SIZE:
+            try:
+                table = json.loads(f.read(header_size - HEADER_SIZE).decode('utf-8'))
+            except ValueError:
+                raise CaptureError(f'{path} has a damaged channel table')
+            channels = {int(channel): info for channel, info in table.items()}
+    return {
+        'version': version,
+        'header_size': header_size,
+        'start_epoch': start_epoch,
+        'baudrate': baudrate,
+        'calibration_offset': offset,
+        'port': port.rstrip(b'\0').decode('utf-8', errors='replace'),
+        'channels': channels,
+    }
+
+
+def open_capture(path):
+    # Returns (header, records) where records is a read-only numpy.memmap of
+    # RECORD_DTYPE; nothing is read from disk until it is indexed.
+    header = read_header(path)
+    count = (os.path.getsize(path) - header['header_size']) // RECORD_DTYPE.itemsize
+    if count <= 0:
+        return header, np.empty(0, dtype=RECORD_DTYPE)
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=header['header_size'], shape=(count,))
+    return header, records
+
+
+def capture_to_csv(src, dst, chunk_size=1 << 20):
+    # Writes the four-column export layout, a chunk of records at a time,
+    # plus a channel column when the capture holds more than one port and an
+    # alarm column when any alarm was raised
+    header, records = open_capture(src)
+    multi_channel = bool(len(records)) and bool(records['channel'].any())
+    alarms = bool(len(records)) and bool(records['flags'].any())
+    with open(dst, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER + [CSV_CHANNEL_COLUMN] * multi_channel + [CSV_ALARM_COLUMN] * alarms)
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            channels = chunk['channel'] if multi_channel else None
+            flags = chunk['flags'] if alarms else None
+            writer.writerows(csv_rows(chunk['t'], chunk['value'], header['start_epoch'], channels, flags))
+    return len(records)
+
+
+class CaptureSink:
+    extension = '.tpcap'
+
+    def __init__(self, path, start_epoch, channels=None):
+        self.file = open(path, 'wb')
+        write_header(self.file, start_epoch, channels)
+
+    def write(self, times, values, channels=0, flags=0):
+        records = np.empty(len(times), dtype=RECORD_DTYPE)
+        records['t'] = times
+        records['value'] = values
+        records['channel'] = channels
+        records['flags'] = flags
+        self.file.write(records.tobytes())
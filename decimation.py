@@ -0,0 +1,232 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+
+class MinMaxPyramid:
+    # Multi-resolution min/max index over an append-only (x, y) series.
+    # Level 0 holds the raw samples. Every bucket of `factor` entries at one
+    # level is summarised at the next level by its minimum and maximum point,
+    # kept in x order, so spikes survive at every resolution. Appending is
+    # amortised O(1): a level only sees work when the level below closes a
+    # bucket. With level_limit set, each level only keeps its newest entries,
+    # so memory stays flat and older history is served by coarser levels.
+    def __init__(self, factor=4, level_limit=None):
+        self.factor = factor
+        self.level_limit = level_limit
+        self.clear()
+
+    def clear(self):
+        self._xs = [array('d')]
+        self._ys = [array('d')]
+        self._trimmed = [False]
+        # Open (not yet full) bucket per level >= 1: [count, x_min, y_min, x_max, y_max]
+        self._open = []
+
+    def __len__(self):
+        return len(self._xs[0])
+
+    @property
+    def levels(self):
+        return len(self._xs)
+
+    def append(self, x, y):
+        self._xs[0].append(x)
+        self._ys[0].append(y)
+        self._merge(1, x, y, x, y)
+        if self.level_limit is not None and len(self._xs[0]) > self.level_limit * 3 // 2:
+            self._trim()
+
+    def _trim(self):
+        # Drop the oldest entries in batches so the memmove is amortised
+        limit = self.level_limit
+        for level in range(len(self._xs) - 1):
+            excess = len(self._xs[level]) - limit
+            if excess > limit // 2:
+                del self._xs[level][:excess]
+                del self._ys[level][:excess]
+                self._trimmed[level] = True
+
+    def extend(self, xs, ys):
+        for x, y in zip(xs, ys):
+            self.append(x, y)
+
+    def _merge(self, level, x_min, y_min, x_max, y_max):
+        factor = self.factor
+        while True:
+            if level > len(self._open):
+                self._open.append([0, 0.0, 0.0, 0.0, 0.0])
+                self._xs.append(array('d'))
+                self._ys.append(array('d'))
+                self._trimmed.append(False)
+            bucket = self._open[level - 1]
+            if bucket[0] == 0:
+                bucket[1:] = [x_min, y_min, x_max, y_max]
+            else:
+                if y_min < bucket[2]:
+                    bucket[1] = x_min
+                    bucket[2] = y_min
+                if y_max > bucket[4]:
+                    bucket[3] = x_max
+                    bucket[4] = y_max
+            bucket[0] += 1
+            if bucket[0] < factor:
+                return
+            bucket[0] = 0
+            _, x_min, y_min, x_max, y_max = bucket
+            self._emit(self._xs[level], self._ys[level], x_min, y_min, x_max, y_max)
+            level += 1
+
+    @staticmethod
+    def _emit(xs, ys, x_min, y_min, x_max, y_max):
+        if x_min <= x_max:
+            xs.append(x_min)
+            ys.append(y_min)
+            xs.append(x_max)
+            ys.append(y_max)
+        else:
+            xs.append(x_max)
+            ys.append(y_max)
+            xs.append(x_min)
+            ys.append(y_min)
+
+    def _tail(self, level):
+        # Samples not yet covered by a closed bucket at `level`, summarised by
+        # the open buckets of the levels below it, oldest first.
+        xs = array('d')
+        ys = array('d')
+        for bucket in reversed(self._open[:level]):
+            if bucket[0]:
+                self._emit(xs, ys, *bucket[1:])
+        return xs, ys
+
+    def query(self, x_start=None, x_end=None, max_points=2000, mode='minmax'):
+        # Returns (xs, ys) numpy arrays for the [x_start, x_end] window using
+        # the finest level that fits in max_points. 'lttb' picks a level with
+        # some headroom and then reduces it with largest-triangle-three-buckets.
+        budget = max_points * 4 if mode == 'lttb' else max_points
+        for level in range(len(self._xs)):
+            xs, ys = self._xs[level], self._ys[level]
+            if self._trimmed[level] and level < len(self._xs) - 1 and (x_start is None or x_start < xs[0]):
+                # This level no longer reaches back to the start of the window
+                continue
+            # One extra point on each side so the line runs to the window edges
+            lo = 0 if x_start is None else max(0, bisect_left(xs, x_start) - 1)
+            hi = len(xs) if x_end is None else min(len(xs), bisect_right(xs, x_end) + 1)
+            tail_x, tail_y = self._tail(level)
+            if hi - lo + len(tail_x) <= budget or level == len(self._xs) - 1:
+                break
+        out_x = np.frombuffer(xs[lo:hi] + tail_x, dtype=np.float64)
+        out_y = np.frombuffer(ys[lo:hi] + tail_y, dtype=np.float64)
+        if len(tail_x) and x_end is not None and hi < len(xs):
+            # The window ends before the open buckets start
+            out_x, out_y = out_x[:hi - lo], out_y[:hi - lo]
+        if mode == 'lttb' and len(out_x) > max_points:
+            out_x, out_y = lttb(out_x, out_y, max_points)
+        return out_x, out_y
+
+
+def minmax_reduce(xs, ys, bucket):
+    # One vectorized pass: every `bucket` consecutive points become their
+    # minimum and maximum point, in x order. A short last bucket is padded
+    # with its own last point.
+    n = len(xs)
+    if not n:
+        return np.empty(0), np.empty(0)
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    pad = -n % bucket
+    if pad:
+        xs = np.concatenate((xs, np.repeat(xs[-1], pad)))
+        ys = np.concatenate((ys, np.repeat(ys[-1], pad)))
+    rows = ys.reshape(-1, bucket)
+    i_min = rows.argmin(axis=1)
+    i_max = rows.argmax(axis=1)
+    base = np.arange(len(rows)) * bucket
+    index = np.empty(2 * len(rows), dtype=np.int64)
+    index[0::2] = base + np.minimum(i_min, i_max)
+    index[1::2] = base + np.maximum(i_min, i_max)
+    return xs[index], ys[index]
+
+
+class MinMaxIndex:
+    # Read-only counterpart of MinMaxPyramid for a finished recording. Level
+    # 0 is the series itself, which may be a numpy.memmap that is never read
+    # in full; level 1 keeps the min and max point of every `bucket`
+    # samples, computed a chunk at a time, and each further level reduces
+    # the one below by `factor` until it has at most min_points points.
+    def __init__(self, xs, ys, bucket=64, factor=4, chunk_size=1 << 20, min_points=1000):
+        self.levels = [(xs, ys)]
+        chunk = max(bucket, chunk_size - chunk_size % bucket)
+        parts = [minmax_reduce(xs[start:start + chunk], ys[start:start + chunk], bucket)
+                 for start in range(0, len(xs), chunk)]
+        if not parts:
+            return
+        level_x = np.concatenate([x for x, _ in parts])
+        level_y = np.concatenate([y for _, y in parts])
+        while len(self.levels[-1][0]) > min_points:
+            self.levels.append((level_x, level_y))
+            # Points come in (min, max) pairs, so 2 * factor points make one bucket
+            level_x, level_y = minmax_reduce(level_x, level_y, 2 * factor)
+
+    def __len__(self):
+        return len(self.levels[0][0])
+
+    def y_range(self):
+        ys = self.levels[-1][1]
+        if not len(ys):
+            return None
+        return float(np.min(ys)), float(np.max(ys))
+
+    def query(self, x_start=None, x_end=None, max_points=2000):
+        # (xs, ys) for the [x_start, x_end] window at no more than max_points;
+        # only that slice of one level is read from disk
+        previous = None
+        for xs, ys in self.levels:
+            lo = 0 if x_start is None else max(0, int(np.searchsorted(xs, x_start)) - 1)
+            hi = len(xs) if x_end is None else min(len(xs), int(np.searchsorted(xs, x_end, side='right')) + 1)
+            if hi - lo <= max_points:
+                if previous is None:
+                    return self._slice(xs, ys, lo, hi)
+                break
+            previous = xs, ys, lo, hi
+        # The next level up is too coarse to fill max_points; reduce this
+        # level's slice to the requested resolution instead
+        xs, ys, lo, hi = previous
+        xs, ys = self._slice(xs, ys, lo, hi)
+        return minmax_reduce(xs, ys, -(-2 * len(xs) // max_points))
+
+    @staticmethod
+    def _slice(xs, ys, lo, hi):
+        return np.asarray(xs[lo:hi], dtype=np.float64), np.asarray(ys[lo:hi], dtype=np.float64)
+
+
+def lttb(xs, ys, n_out):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, for
+    # each bucket in between, the point forming the largest triangle with the
+    # previously kept point and the average of the next bucket.
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = len(xs)
+    if n_out >= n or n_out < 3:
+        return xs, ys
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < n_out - 1:
+            next_start, next_stop = edges[i + 1], edges[i + 2]
+            avg_x = xs[next_start:next_stop].mean()
+            avg_y = ys[next_start:next_stop].mean()
+        else:
+            avg_x, avg_y = xs[-1], ys[-1]
+        bx = xs[start:stop]
+        by = ys[start:stop]
+        area = np.abs((xs[prev] - avg_x) * (by - ys[prev]) - (xs[prev] - bx) * (avg_y - ys[prev]))
+        prev = start + int(area.argmax())
+        keep[i + 1] = prev
+    return xs[keep], ys[keep]
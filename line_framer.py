@@ -0,0 +1,62 @@
+import time
+
+
+class LineFramer:
+    # Splits a raw byte stream into lines. Each feed() appends the chunk to a
+    # reusable bytearray, cuts every complete line out in a single split and
+    # keeps the unterminated tail for the next chunk.
+    def __init__(self, delimiter=b'\n', max_line_length=4096, rate_window=1.0):
+        self.delimiter = delimiter
+        self.max_line_length = max_line_length
+        self.rate_window = rate_window
+        self._buffer = bytearray()
+        self.total_bytes = 0
+        self.total_lines = 0
+        self.overflows = 0
+        self.lines_per_sec = 0.0
+        self.bytes_per_sec = 0.0
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_lines = 0
+        self._resync = False
+
+    def feed(self, data):
+        buffer = self._buffer
+        buffer += data
+        self.total_bytes += len(data)
+        end = buffer.rfind(self.delimiter)
+        if end < 0:
+            if len(buffer) > self.max_line_length:
+                # No delimiter in sight: the stream is garbage or the wrong baud
+                self.overflows += 1
+                del buffer[:]
+            lines = []
+        else:
+            lines = bytes(memoryview(buffer)[:end]).split(self.delimiter)
+            del buffer[:end + len(self.delimiter)]
+            if self._resync:
+                self._resync = False
+                del lines[0]
+            self.total_lines += len(lines)
+        self._update_rates()
+        return lines
+
+    def _update_rates(self):
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= self.rate_window:
+            self.lines_per_sec = (self.total_lines - self._window_lines) / elapsed
+            self.bytes_per_sec = (self.total_bytes - self._window_bytes) / elapsed
+            self._window_start = now
+            self._window_bytes = self.total_bytes
+            self._window_lines = self.total_lines
+
+    @property
+    def pending(self):
+        return len(self._buffer)
+
+    def resync(self):
+        # For a stream picked up again mid-line (after a reconnect): drops
+        # the buffered tail and the first, probably truncated, line
+        del self._buffer[:]
+        self._resync = True
@@ -0,0 +1,138 @@
+import json
+import time
+from bisect import bisect_left
+
+# Process-wide hot-path instrumentation. Counters are always on (an int
+# increment); timing histograms are only recorded while METRICS.enabled is
+# set, and the hot paths check that flag once per batch rather than once
+# per sample, so switching them off costs next to nothing.
+
+
+class Histogram:
+    # Fixed log-spaced buckets (about 19% apart) from 1 us to about 70 s
+    # (values in ms), so recording is a bisect and an increment and memory
+    # never grows
+    bounds = [0.001 * 2 ** (i / 4) for i in range(105)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th percentile
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 4),
+            'p50': round(self.percentile(50), 4),
+            'p95': round(self.percentile(95), 4),
+            'p99': round(self.percentile(99), 4),
+            'max': round(self.max, 4),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value_ms):
+        if not self.enabled:
+            return
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.record(value_ms)
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def snapshot(self):
+        return {
+            'time': time.time(),
+            'timing': self.enabled,
+            'counters': dict(self.counters),
+            'histograms': {name: h.summary() for name, h in list(self.histograms.items())},
+        }
+
+
+METRICS = Metrics()
+
+
+def format_snapshot(snapshot):
+    # Short text form for the GUI overlay and the CLI
+    lines = []
+    for port, stats in snapshot.get('ports', {}).items():
+        lines.append(f'{port}: {stats["lines_per_sec"]:.0f} lines/s  {stats["bytes_per_sec"]:.0f} B/s  '
+                     f'{stats["lines"]} lines  {stats["unparsed"]} unparsed  {stats["out_of_range"]} out of range'
+                     + (f'  {stats["reconnects"]} reconnects' if stats.get('reconnects') else ''))
+        interval = stats.get('interval_ms')
+        if interval is not None:
+            lines.append(f'  interval {interval["mean"]:.3f} ± {interval["stdev"]:.3f} ms '
+                         f'(min {interval["min"]:.3f}, max {interval["max"]:.3f})')
+    queue = snapshot.get('queue')
+    if queue is not None:
+        lines.append(f'queue: depth {queue["depth"]}  dropped {queue["dropped"]}')
+    publisher = snapshot.get('publisher')
+    if publisher is not None:
+        lines.append(f'publisher: {publisher["clients"]} clients  sent {publisher["sent"]}  dropped {publisher["dropped"]}')
+    counters = snapshot['counters']
+    if counters:
+        lines.append('  '.join(f'{name} {value}' for name, value in sorted(counters.items())))
+    for name, h in sorted(snapshot['histograms'].items()):
+        if h['count']:
+            lines.append(f'{name}: p50 {h["p50"]:.3f}  p95 {h["p95"]:.3f}  p99 {h["p99"]:.3f}  max {h["max"]:.3f}  (n={h["count"]})')
+    if not snapshot['timing']:
+        lines.append('(timing off)')
+    return '\n'.join(lines)
+
+
+class MetricsLog:
+    # Appends a snapshot as one JSON line every interval seconds
+    def __init__(self, path, interval=10.0):
+        self.path = path
+        self.interval = interval
+        self.file = open(path, 'a', encoding='utf-8')
+        self._next = time.monotonic() + interval
+
+    def maybe_write(self, snapshot):
+        # snapshot is called only when a line is due
+        now = time.monotonic()
+        if now < self._next:
+            return False
+        self._next = now + self.interval
+        self.write(snapshot())
+        return True
+
+    def write(self, data):
+        self.file.write(json.dumps(data) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,203 @@
+import math
+import time
+
+from PyQt6.QtCore import QTimer
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+
+from decimation import MinMaxPyramid
+from metrics import METRICS
+
+# Imported lazily by serial_terminal once the main window is up, so
+# matplotlib never sits on the path to the first window.
+
+
+def nice_step(value):
+    # Smallest of 1, 2 or 5 times a power of ten that is at least value
+    raw = max(value, 1e-6)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+class TemperaturePlotCanvas(FigureCanvas):
+    # Line colours per channel; channel 0 keeps the original Microchip blue
+    channel_colors = ['#00A4E3', '#E65100', '#43A047', '#8E24AA', '#F9A825', '#D81B60', '#5D4037', '#546E7A']
+
+    def __init__(self, parent=None, width=5, height=4, dpi=100, max_fps=20, decimation='minmax'):
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = fig.add_subplot(111)
+        super().__init__(fig)
+        self.setParent(parent)
+        # Plotted series per channel, indexed at several resolutions so a
+        # redraw only ever hands a line about as many points as the axes are
+        # pixels wide
+        self.histories = {0: MinMaxPyramid(level_limit=100000)}
+        self.decimation = decimation
+        self.min_temp = None
+        self.max_temp = None
+        self.axes.set_title('Temperature History')
+        self.axes.set_xlabel('Sample #')
+        self.axes.set_ylabel('°C')
+        self.axes.grid(True)
+        # Lines are animated: full draws render only the static axes, which
+        # are cached and the lines are blitted on top of them.
+        self.line, = self.axes.plot([], [], color='#00A4E3', linewidth=2, animated=True)
+        self.lines = {0: self.line}
+        self.channel_labels = {}
+        self.fig = fig
+        self._background = None
+        self._dirty = False
+        self._limits_changed = False
+        self._xlim = (0, 20)
+        self._ylim = None
+        self._tick_interval = None
+        self.mpl_connect('draw_event', self._on_draw)
+        # Samples only mark the plot dirty; this timer coalesces them into at
+        # most max_fps redraws per second.
+        self._render_timer = QTimer(self)
+        self._render_timer.timeout.connect(self._render)
+        self.set_max_fps(max_fps)
+
+    def set_max_fps(self, max_fps):
+        self.max_fps = max_fps
+        self._render_timer.start(max(1, int(1000 / max_fps)))
+
+    def set_channel_label(self, channel, label):
+        self.channel_labels[channel] = label
+        if channel in self.lines:
+            self.lines[channel].set_label(label)
+            self._limits_changed = True
+            self._dirty = True
+
+    def _channel(self, channel):
+        history = self.histories.get(channel)
+        if history is None:
+            history = self.histories[channel] = MinMaxPyramid(level_limit=100000)
+        if channel not in self.lines:
+            color = self.channel_colors[channel % len(self.channel_colors)]
+            label = self.channel_labels.get(channel, f'Channel {channel}')
+            self.lines[channel], = self.axes.plot([], [], color=color, linewidth=2, animated=True, label=label)
+            # A new artist means the legend has to be redrawn
+            self._limits_changed = True
+        return history
+
+    def update_plot(self, temp, elapsed_sec=None, channel=0):
+        history = self._channel(channel)
+        if self.min_temp is None or temp < self.min_temp:
+            self.min_temp = temp
+        if self.max_temp is None or temp > self.max_temp:
+            self.max_temp = temp
+        # The y axis has headroom, so a drifting reading only forces a full
+        # redraw once it leaves the current limits
+        ylim = self._ylim
+        if ylim is None or not ylim[0] <= temp <= ylim[1]:
+            self._limits_changed = True
+        if elapsed_sec is not None:
+            history.append(elapsed_sec, temp)
+            max_sec = int(elapsed_sec)
+            # Dynamic x-tick interval
+            if max_sec <= 120:
+                tick_interval = 10
+            elif max_sec <= 300:
+                tick_interval = 30
+            elif max_sec <= 600:
+                tick_interval = 60
+            else:
+                tick_interval = 120
+            # Grow the x axis a whole tick interval at a time so the axes only
+            # need a full redraw when a new interval starts.
+            if max_sec + 1 > self._xlim[1] or tick_interval != self._tick_interval:
+                x_max = max(20, -(-(max_sec + 1) // tick_interval) * tick_interval)
+                self._xlim = (0, x_max)
+                self._tick_interval = tick_interval
+                self._limits_changed = True
+        else:
+            history.append(len(history), temp)
+            if len(history) > self._xlim[1]:
+                self._xlim = (0, max(20, int(len(history) * 1.25)))
+                self._tick_interval = None
+                self._limits_changed = True
+        self._dirty = True
+
+    def _apply_limits(self):
+        self.axes.set_xlim(*self._xlim)
+        if self._tick_interval is None:
+            self.axes.set_xticks([])
+        else:
+            ticks = list(range(0, self._xlim[1] + 1, self._tick_interval))
+            self.axes.set_xticks(ticks)
+            self.axes.set_xticklabels([str(x) for x in ticks])
+        if self.min_temp is not None:
+            # At least 1 °C, or a quarter of the range, of headroom on each
+            # side, rounded outwards to a round number
+            headroom = max(1.0, (self.max_temp - self.min_temp) / 4)
+            low = self.min_temp - headroom
+            high = self.max_temp + headroom
+            step = nice_step(headroom / 5)
+            self._ylim = (math.floor(low / step) * step, math.ceil(high / step) * step)
+            self.axes.set_ylim(*self._ylim)
+        legend = self.axes.get_legend()
+        if len(self.lines) > 1:
+            self.axes.legend(handles=[self.lines[ch] for ch in sorted(self.lines)], loc='upper left')
+        elif legend is not None:
+            legend.remove()
+
+    def _render(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        timed = METRICS.enabled
+        if timed:
+            t0 = time.perf_counter()
+        # Two points (min and max) per horizontal pixel
+        max_points = max(100, 2 * int(self.axes.bbox.width))
+        for channel, history in self.histories.items():
+            self.lines[channel].set_data(*history.query(max_points=max_points, mode=self.decimation))
+        if self._limits_changed or self._background is None:
+            self._limits_changed = False
+            self._apply_limits()
+            self.draw()
+            METRICS.count('full_draws')
+            if timed:
+                METRICS.observe('draw_ms', (time.perf_counter() - t0) * 1000)
+            return
+        self.restore_region(self._background)
+        for line in self.lines.values():
+            self.axes.draw_artist(line)
+        self.blit(self.axes.bbox)
+        METRICS.count('blits')
+        if timed:
+            METRICS.observe('blit_ms', (time.perf_counter() - t0) * 1000)
+
+    def _on_draw(self, event):
+        self._background = self.copy_from_bbox(self.axes.bbox)
+        for line in self.lines.values():
+            self.axes.draw_artist(line)
+
+    def clear_plot(self):
+        for channel in list(self.lines):
+            if channel != 0:
+                self.lines.pop(channel).remove()
+        self.histories = {0: self.histories[0]}
+        self.histories[0].clear()
+        legend = self.axes.get_legend()
+        if legend is not None:
+            legend.remove()
+        self.min_temp = None
+        self.max_temp = None
+        self._ylim = None
+        self._dirty = False
+        self._limits_changed = False
+        self._xlim = (0, 20)
+        self._tick_interval = None
+        self.line.set_data([], [])
+        self.axes.set_xlim(0, 20)
+        self.axes.set_ylim(0, 50)
+        self.draw()
+
+    def reset(self, xlabel='Sample #'):
+        self.axes.set_xlabel(xlabel)
+        self.clear_plot()
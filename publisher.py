@@ -0,0 +1,199 @@
+import asyncio
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from capture import RECORD_DTYPE
+
+# Live feed for other processes. An asyncio server on its own thread fans
+# every drained batch out to any number of local subscribers, over TCP or a
+# Unix socket:
+#
+#   json    one object per sample and line:
+#           {"t": <unix seconds>, "value": 22.51, "channel": 0, "flags": 0}
+#           preceded by {"dropped": N} when this client lost N samples
+#   binary  frames of a little-endian uint32 sample count followed by that
+#           many capture.RECORD_DTYPE records (t in unix seconds)
+#
+# Every client has its own bounded queue of encoded batches. A client that
+# cannot keep up loses batches according to the drop policy ('oldest',
+# 'newest' or 'disconnect'); acquisition never waits for it.
+
+FORMATS = ('json', 'binary')
+DROP_POLICIES = ('oldest', 'newest', 'disconnect')
+_FRAME = struct.Struct('<I')
+
+
+def parse_address(address):
+    # 'PORT', 'HOST:PORT' or 'unix:PATH' -> ('tcp', host, port) / ('unix', path)
+    address = str(address)
+    if address.startswith('unix:'):
+        return ('unix', address[5:])
+    host, _, port = address.rpartition(':')
+    return ('tcp', host or '127.0.0.1', int(port))
+
+
+def encode_json(samples, offset_ns):
+    lines = [f'{{"t": {(t_ns + offset_ns) / 1e9:.6f}, "value": {value:.4f}, "channel": {channel}, "flags": {flags}}}\n'
+             for t_ns, value, channel, flags in samples]
+    return ''.join(lines).encode('ascii')
+
+
+def encode_binary(samples, offset_ns):
+    stamps, values, channels, flags = zip(*samples)
+    records = np.empty(len(samples), dtype=RECORD_DTYPE)
+    records['t'] = (np.array(stamps, dtype=np.int64) + offset_ns) / 1e9
+    records['value'] = values
+    records['channel'] = channels
+    records['flags'] = flags
+    return _FRAME.pack(len(samples)) + records.tobytes()
+
+
+class _Client:
+    def __init__(self, publisher, writer):
+        self.publisher = publisher
+        self.writer = writer
+        self.peer = writer.get_extra_info('peername') or 'unix'
+        self.frames = deque()
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self._unreported = 0
+
+    def push(self, frame, count):
+        publisher = self.publisher
+        if len(self.frames) >= publisher.max_pending:
+            if publisher.drop == 'disconnect':
+                # close() would first flush what the slow client has not
+                # read yet; drop the connection and its buffer at once
+                self.drop(count)
+                self.frames.clear()
+                self.writer.transport.abort()
+                return
+            if publisher.drop == 'newest':
+                self.drop(count)
+                return
+            self.drop(self.frames.popleft()[1])
+        self.frames.append((frame, count))
+        self.wakeup.set()
+
+    def drop(self, count):
+        self.dropped += count
+        self._unreported += count
+        self.publisher.dropped += count
+
+    async def send(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.frames:
+                frame, count = self.frames.popleft()
+                if self._unreported and self.publisher.format == 'json':
+                    self.writer.write(f'{{"dropped": {self._unreported}}}\n'.encode('ascii'))
+                    self._unreported = 0
+                self.writer.write(frame)
+                # Returns at once unless the socket buffer is full
+                await self.writer.drain()
+                self.sent += count
+                self.publisher.sent += count
+
+
+class Publisher(threading.Thread):
+    def __init__(self, address=8765, format='json', max_pending=64, drop='oldest'):
+        super().__init__(name='Publisher', daemon=True)
+        if format not in FORMATS:
+            raise ValueError(f'Unknown publish format: {format!r} (known: {", ".join(FORMATS)})')
+        if drop not in DROP_POLICIES:
+            raise ValueError(f'Unknown drop policy: {drop!r} (known: {", ".join(DROP_POLICIES)})')
+        self.address = parse_address(address)
+        self.format = format
+        self._encode = encode_json if format == 'json' else encode_binary
+        # Batches (one per drain) queued per client before drop applies
+        self.max_pending = max_pending
+        self.drop = drop
+        self.sent = 0
+        self.dropped = 0
+        self.error = None
+        self._clients = set()
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        # Bind in the caller's thread of control so errors surface immediately
+        self.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def clients(self):
+        return len(self._clients)
+
+    def publish(self, samples):
+        # Called by Acquisition.pump with [(t_ns, value, channel, flags)];
+        # costs nothing while nobody is subscribed
+        if not self._clients or not samples:
+            return
+        offset_ns = time.time_ns() - time.monotonic_ns()
+        self._loop.call_soon_threadsafe(self._fan_out, samples, offset_ns)
+
+    def _fan_out(self, samples, offset_ns):
+        # Encoded once, shared by every client
+        frame = self._encode(samples, offset_ns)
+        for client in list(self._clients):
+            client.push(frame, len(samples))
+
+    async def _serve(self, reader, writer):
+        client = _Client(self, writer)
+        self._clients.add(client)
+        sender = asyncio.ensure_future(client.send())
+        # Subscribers have nothing to say; EOF means they are gone
+        listener = asyncio.ensure_future(reader.read())
+        try:
+            await asyncio.wait([sender, listener], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            listener.cancel()
+            writer.close()
+
+    async def _start(self):
+        if self.address[0] == 'unix':
+            path = self.address[1]
+            if os.path.exists(path):
+                os.remove(path)
+            return await asyncio.start_unix_server(self._serve, path)
+        return await asyncio.start_server(self._serve, self.address[1], self.address[2])
+
+    def run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        try:
+            self._server = loop.run_until_complete(self._start())
+        except Exception as e:
+            self.error = e
+            loop.close()
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            for client in list(self._clients):
+                client.writer.close()
+            loop.run_until_complete(self._server.wait_closed())
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
+            if self.address[0] == 'unix' and os.path.exists(self.address[1]):
+                os.remove(self.address[1])
+
+    def stats(self):
+        return {'clients': self.clients, 'sent': self.sent, 'dropped': self.dropped}
+
+    def stop(self, timeout=1.0):
+        if self.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self.join(timeout)
@@ -0,0 +1,100 @@
+import csv
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from sample_store import CSV_HEADER, CSV_CHANNEL_COLUMN, CSV_ALARM_COLUMN, csv_rows
+
+
+class CsvSink:
+    extension = '.csv'
+
+    def __init__(self, path, start_epoch, channels=False, alarms=False):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.start_epoch = start_epoch
+        self.channels = channels
+        self.alarms = alarms
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_HEADER + [CSV_CHANNEL_COLUMN] * channels + [CSV_ALARM_COLUMN] * alarms)
+
+    def write(self, times, values, channels=0, flags=0):
+        self.writer.writerows(csv_rows(times, values, self.start_epoch, channels if self.channels else None,
+                                       flags if self.alarms else None))
+
+
+class Recorder(threading.Thread):
+    # Streams a collection session to disk while it runs. append() only
+    # queues the sample; a background thread writes the queue out in batches,
+    # flushes every flush_interval and fsyncs every fsync_interval, so a crash
+    # loses at most a few seconds. Data goes to "<path>.part" until close()
+    # renames it into place. `sink` decides the file format (CsvSink or
+    # capture.CaptureSink); sink_options are passed on to it.
+    def __init__(self, path, start_epoch, sink=CsvSink, flush_interval=0.5, fsync_interval=5.0, **sink_options):
+        super().__init__(name=f'Recorder({os.path.basename(path)})', daemon=True)
+        self.path = path
+        self.part_path = path + '.part'
+        self.start_epoch = start_epoch
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.samples_written = 0
+        self.error = None
+        self._pending = deque()
+        self._stop_event = threading.Event()
+        self._sink = sink(self.part_path, start_epoch, **sink_options)
+        self._file = self._sink.file
+        self.start()
+
+    def append(self, t, value, channel=0, flags=0):
+        self._pending.append((t, value, channel, flags))
+
+    @property
+    def backlog(self):
+        return len(self._pending)
+
+    def run(self):
+        last_fsync = time.monotonic()
+        try:
+            while not self._stop_event.wait(self.flush_interval):
+                self._write_pending()
+                self._file.flush()
+                if time.monotonic() - last_fsync >= self.fsync_interval:
+                    os.fsync(self._file.fileno())
+                    last_fsync = time.monotonic()
+        except Exception as e:
+            self.error = e
+
+    def _write_pending(self):
+        count = len(self._pending)
+        if not count:
+            return
+        popleft = self._pending.popleft
+        batch = [popleft() for _ in range(count)]
+        times, values, channels, flags = np.array(batch, dtype=np.float64).T
+        # Values are stored as float32
+        self._sink.write(times, values.astype(np.float32), channels.astype(np.uint16), flags.astype(np.uint16))
+        self.samples_written += count
+
+    def close(self, final_path=None):
+        # Finishes writing, fsyncs and moves the recording to final_path (or
+        # the path it was opened with). Returns where the file ended up.
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+        try:
+            if self.error is None:
+                self._write_pending()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+        target = final_path or self.path
+        try:
+            os.replace(self.part_path, target)
+        except OSError:
+            # Different filesystem
+            shutil.move(self.part_path, target)
+        return target
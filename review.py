@@ -0,0 +1,104 @@
+import csv
+import os
+from datetime import datetime
+
+import numpy as np
+
+from capture import MAGIC, open_capture
+from decimation import MinMaxIndex
+from sample_store import CSV_CHANNEL_COLUMN
+
+# A finished session opened for review. Captures are memory-mapped and
+# only read a chunk at a time while the index is built; CSV exports are
+# parsed in chunks into compact arrays. Each channel gets a MinMaxIndex, so
+# any time window can be drawn at screen resolution without touching the
+# rest of the recording.
+
+
+def _is_capture(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class Recording:
+    def __init__(self, path, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.port = ''
+        if _is_capture(path):
+            series = self._load_capture(path)
+        else:
+            series = self._load_csv(path)
+        self.indexes = {channel: MinMaxIndex(t, v, chunk_size=chunk_size) for channel, (t, v) in series.items()}
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def channels(self):
+        return sorted(self.indexes)
+
+    @property
+    def samples(self):
+        return sum(len(index) for index in self.indexes.values())
+
+    @property
+    def duration(self):
+        ends = [float(index.levels[0][0][-1]) for index in self.indexes.values() if len(index)]
+        return max(ends) if ends else 0.0
+
+    def y_range(self):
+        ranges = [r for r in (index.y_range() for index in self.indexes.values()) if r is not None]
+        if not ranges:
+            return None
+        return min(low for low, _ in ranges), max(high for _, high in ranges)
+
+    def query(self, channel, x_start=None, x_end=None, max_points=2000):
+        return self.indexes[channel].query(x_start, x_end, max_points)
+
+    def _load_capture(self, path):
+        header, records = open_capture(path)
+        self.start_epoch = header['start_epoch']
+        self.port = header['port']
+        chunk = self.chunk_size
+        channels = set()
+        for start in range(0, len(records), chunk):
+            channels.update(np.unique(records['channel'][start:start + chunk]).tolist())
+        if len(channels) <= 1:
+            # Single port: the index reads the mapped file in place
+            return {channels.pop() if channels else 0: (records['t'], records['value'])}
+        parts = {channel: ([], []) for channel in channels}
+        for start in range(0, len(records), chunk):
+            block = records[start:start + chunk]
+            for channel in channels:
+                mask = block['channel'] == channel
+                parts[channel][0].append(np.array(block['t'][mask]))
+                parts[channel][1].append(np.array(block['value'][mask]))
+        return {channel: (np.concatenate(t), np.concatenate(v)) for channel, (t, v) in parts.items()}
+
+    def _load_csv(self, path):
+        parts = {}
+        self.start_epoch = None
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            channel_column = header.index(CSV_CHANNEL_COLUMN) if CSV_CHANNEL_COLUMN in header else None
+            while True:
+                rows = [row for _, row in zip(range(self.chunk_size), reader) if row]
+                if not rows:
+                    break
+                if self.start_epoch is None:
+                    # The Timestamp column has whole seconds only
+                    first = rows[0]
+                    self.start_epoch = datetime.strptime(first[3], '%Y-%m-%d %H:%M:%S').timestamp() - float(first[0])
+                columns = list(zip(*rows))
+                t = np.array(columns[0], dtype=np.float64)
+                v = np.array(columns[1], dtype=np.float32)
+                channels = np.array(columns[channel_column], dtype=np.uint16) if channel_column is not None else None
+                for channel in ([0] if channels is None else np.unique(channels).tolist()):
+                    mask = slice(None) if channels is None else channels == channel
+                    part = parts.setdefault(channel, ([], []))
+                    part[0].append(t[mask])
+                    part[1].append(v[mask])
+        return {channel: (np.concatenate(t), np.concatenate(v)) for channel, (t, v) in parts.items()}
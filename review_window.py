@@ -0,0 +1,90 @@
+import time
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QMainWindow, QVBoxLayout, QWidget
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qtagg import NavigationToolbar2QT
+from matplotlib.figure import Figure
+
+from plot_canvas import TemperaturePlotCanvas
+from review import Recording
+
+# Browses a finished recording. Zooming or panning never redraws the whole
+# file: every view change re-queries only the visible time window from the
+# recording's min/max index, at about two points per pixel of axes width.
+
+
+class ReviewWindow(QMainWindow):
+    # Relative zoom per scroll-wheel notch
+    zoom_step = 1.25
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        t0 = time.perf_counter()
+        self.recording = Recording(path)
+        index_ms = (time.perf_counter() - t0) * 1000
+        self.setWindowTitle(f'Review - {self.recording.name}')
+        self.resize(1000, 600)
+        self.figure = Figure(figsize=(10, 5), dpi=100)
+        self.axes = self.figure.add_subplot(111)
+        self.canvas = FigureCanvas(self.figure)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self)
+        central = QWidget()
+        layout = QVBoxLayout(central)
+        layout.addWidget(self.toolbar)
+        layout.addWidget(self.canvas)
+        self.setCentralWidget(central)
+
+        self.axes.set_title(self.recording.name)
+        self.axes.set_xlabel('Time (s)')
+        self.axes.set_ylabel('°C')
+        self.axes.grid(True)
+        colors = TemperaturePlotCanvas.channel_colors
+        self.lines = {}
+        for channel in self.recording.channels:
+            self.lines[channel], = self.axes.plot([], [], color=colors[channel % len(colors)], linewidth=1.5,
+                                                  label=f'channel {channel}')
+        if len(self.lines) > 1:
+            self.axes.legend(loc='upper left')
+        self.axes.set_xlim(0, max(1.0, self.recording.duration))
+        y_range = self.recording.y_range()
+        if y_range is not None:
+            self.axes.set_ylim(y_range[0] - 1, y_range[1] + 1)
+
+        self._index_ms = index_ms
+        # Toolbar pan/zoom and home all go through the x limits
+        self.axes.callbacks.connect('xlim_changed', self._on_xlim_changed)
+        self.canvas.mpl_connect('scroll_event', self._on_scroll)
+        self.canvas.mpl_connect('resize_event', self._on_xlim_changed)
+        # Limit changes arrive in bursts while dragging; refresh once per event loop pass
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def _on_xlim_changed(self, *args):
+        self._refresh_timer.start(0)
+
+    def _on_scroll(self, event):
+        # Zoom the time axis around the cursor
+        if event.xdata is None:
+            return
+        x_start, x_end = self.axes.get_xlim()
+        scale = 1 / self.zoom_step if event.button == 'up' else self.zoom_step
+        self.axes.set_xlim(event.xdata - (event.xdata - x_start) * scale,
+                           event.xdata + (x_end - event.xdata) * scale)
+
+    def refresh(self):
+        x_start, x_end = self.axes.get_xlim()
+        max_points = max(100, 2 * int(self.axes.bbox.width))
+        t0 = time.perf_counter()
+        shown = 0
+        for channel, line in self.lines.items():
+            xs, ys = self.recording.query(channel, x_start, x_end, max_points)
+            line.set_data(xs, ys)
+            shown += len(xs)
+        query_ms = (time.perf_counter() - t0) * 1000
+        self.statusBar().showMessage(
+            f'{x_start:,.1f} - {x_end:,.1f} s   {shown:,} of {self.recording.samples:,} samples drawn   '
+            f'query {query_ms:.1f} ms   index built in {self._index_ms:.0f} ms')
+        self.canvas.draw_idle()
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+import numpy as np
+
+from alarms import FLAG_NAMES, flag_names
+
+CSV_HEADER = ['Seconds', 'Temperature (°C)', 'Temperature (°F)', 'Timestamp']
+# Appended to the export layout only for multi-port sessions
+CSV_CHANNEL_COLUMN = 'Channel'
+# Appended when alarms were set: the alarms active at each sample
+CSV_ALARM_COLUMN = 'Alarm'
+
+
+def csv_rows(times, values, start_epoch, channels=None, flags=None):
+    # Rows in the export layout, with the numeric columns computed in bulk.
+    # Timestamps are only formatted here, once per distinct wall-clock second
+    # rather than once per sample.
+    times = np.asarray(times, dtype=np.float64)
+    temps = np.round(np.asarray(values, dtype=np.float64), 4)
+    seconds, inverse = np.unique(np.floor(start_epoch + times).astype(np.int64), return_inverse=True)
+    stamps = np.array([datetime.fromtimestamp(sec).strftime('%Y-%m-%d %H:%M:%S') for sec in seconds.tolist()], dtype=object)
+    columns = [np.round(times, 6).tolist(), temps.tolist(), np.round(temps * 1.8 + 32, 4).tolist(), stamps[inverse].tolist()]
+    if channels is not None:
+        columns.append(np.broadcast_to(np.asarray(channels, dtype=np.uint16), times.shape).tolist())
+    if flags is not None:
+        # One name per combination of the defined flag bits
+        known = 1 << len(FLAG_NAMES)
+        names = np.array([flag_names(f) for f in range(known)], dtype=object)
+        columns.append(names[np.broadcast_to(np.asarray(flags, dtype=np.uint16), times.shape) & (known - 1)].tolist())
+    return zip(*columns)
@@ -0,0 +1,211 @@
+import time
+from collections import deque
+
+from alarms import FLAG_GAP
+from line_framer import LineFramer
+from metrics import METRICS
+from temp_parser import get_parser
+from timestamps import DeviceClock, JitterStats
+from transports import find_port, open_transport, port_identity
+
+
+class SampleQueue:
+    # Bounded single-producer/single-consumer ring. deque.append and
+    # deque.popleft are atomic in CPython, so no lock is needed; when the ring
+    # is full the oldest sample is overwritten and counted as dropped.
+    def __init__(self, maxlen=65536):
+        self._items = deque(maxlen=maxlen)
+        self.maxlen = maxlen
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def put(self, item):
+        if len(self._items) >= self.maxlen:
+            self.dropped += 1
+        self._items.append(item)
+
+    def drain(self, max_items=None):
+        items = []
+        popleft = self._items.popleft
+        count = len(self._items) if max_items is None else min(max_items, len(self._items))
+        try:
+            for _ in range(count):
+                items.append(popleft())
+        except IndexError:
+            pass
+        return items
+
+    def clear(self):
+        self._items.clear()
+        self.dropped = 0
+
+
+class PortReader:
+    # One serial port: owns the transport (a non-blocking pyserial handle, or
+    # a replay/synthetic source for sim:// and replay:// ports), frames
+    # and parses whatever bytes are waiting and pushes calibrated
+    # (t_ns, value, channel, alarm flags) samples. It has no thread of its
+    # own; session_manager.SessionManager services any number of them.
+    def __init__(self, port, baudrate, channel=0, calibration_offset=0.0, parser=None, alarms=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.channel = channel
+        self.calibration_offset = calibration_offset
+        # alarms.AlarmEngine checked with every sample, before the range check
+        self.alarms = alarms
+        # Open in the caller's thread so connection errors surface immediately
+        self.serial_port = open_transport(port, baudrate)
+        if parser is None:
+            # Simulated sensors know their line format; real ports default to 'temp'
+            parser = getattr(self.serial_port, 'parser', 'temp')
+        self.parser = get_parser(parser) if isinstance(parser, str) else parser
+        # USB ids used to find the same adapter again after a disconnect
+        self.identity = port_identity(port)
+        self.framer = LineFramer()
+        # Time on the wire per byte (start + 8 data + stop bits)
+        self._byte_ns = 10e9 / baudrate
+        self.device_clock = DeviceClock()
+        self.jitter = JitterStats()
+        # Arrival stamp of the last line read
+        self._last_ns = 0
+        self.error = None
+        self.lines_read = 0
+        # Rejected by the parser / by is_valid_temperature
+        self.lines_unparsed = 0
+        self.lines_out_of_range = 0
+        # Connection losses survived, and when the current one started
+        # (monotonic seconds, None while connected); see reopen()
+        self.reconnects = 0
+        self.lost_at = None
+        self.last_gap = 0.0
+        self._gap_flag = 0
+
+    @property
+    def lines_rejected(self):
+        return self.lines_unparsed + self.lines_out_of_range
+
+    @property
+    def lines_per_sec(self):
+        return self.framer.lines_per_sec
+
+    @property
+    def bytes_per_sec(self):
+        return self.framer.bytes_per_sec
+
+    def fileno(self):
+        # Only available on POSIX; callers fall back to polling without it
+        return self.serial_port.fileno()
+
+    def is_valid_temperature(self, temp):
+        return -40 <= temp <= 125
+
+    def is_plausible_temperature(self, temp):
+        # Wider than the valid range: what a real sensor can report at all
+        return -100 <= temp <= 300
+
+    def poll(self, queue):
+        # Reads everything the driver has buffered; returns the byte count
+        waiting = self.serial_port.in_waiting
+        if not waiting:
+            return 0
+        timed = METRICS.enabled
+        if timed:
+            t0 = time.perf_counter()
+        data = self.serial_port.read(waiting)
+        arrival_ns = time.monotonic_ns()
+        if timed:
+            t1 = time.perf_counter()
+        lines = self.framer.feed(data)
+        if lines:
+            # Back-date each line by the time the bytes after it took on
+            # the wire, so lines read in one chunk keep their spacing.
+            trailing = self.framer.pending
+            byte_ns = getattr(self.serial_port, 'byte_ns', self._byte_ns)
+            stamps = []
+            for line in reversed(lines):
+                stamps.append(arrival_ns - int(trailing * byte_ns))
+                trailing += len(line) + 1
+            stamps.reverse()
+            if stamps[0] < self._last_ns:
+                # Back-dating overshot into the previous read; never go backwards
+                last = self._last_ns
+                stamps = [max(t_ns, last) for t_ns in stamps]
+            self._last_ns = stamps[-1]
+            for line, t_ns in zip(lines, stamps):
+                self._handle_line(queue, line, t_ns)
+        if timed:
+            t2 = time.perf_counter()
+            METRICS.observe('serial_read_ms', (t1 - t0) * 1000)
+            METRICS.observe('parse_ms', (t2 - t1) * 1000)
+        return len(data)
+
+    def _handle_line(self, queue, line, t_ns):
+        self.lines_read += 1
+        try:
+            temp = self.parser(line)
+        except Exception:
+            temp = None
+        if temp is None:
+            self.lines_unparsed += 1
+            return
+        if isinstance(temp, tuple):
+            device_seconds, temp = temp
+            t_ns = self.device_clock.to_host_ns(device_seconds, t_ns)
+        value = temp + self.calibration_offset
+        if not self.is_plausible_temperature(temp):
+            # A corrupted line, not a hot or cold sensor; kept from the alarms
+            self.lines_out_of_range += 1
+            return
+        # Out-of-range readings still reach the alarms: an overheating
+        # sensor must not go unnoticed just because it left the valid range
+        flags = self.alarms.check(self.channel, t_ns, value) if self.alarms is not None else 0
+        if not self.is_valid_temperature(temp):
+            self.lines_out_of_range += 1
+            if not flags:
+                return
+            # Recorded after all, so the data shows the reading that raised the alarm
+        if self._gap_flag:
+            # First sample after a reconnect marks the gap before it
+            flags |= self._gap_flag
+            self._gap_flag = 0
+            self.jitter.restart()
+        self.jitter.update(t_ns)
+        queue.put((t_ns, value, self.channel, flags))
+
+    def reopen(self, exclude=()):
+        # Opens the device again after an I/O error, under its new name if
+        # the OS renumbered it; raises OSError/SerialException while it is
+        # still gone. exclude lists ports other readers hold. Counters,
+        # calibration and the channel are kept.
+        port = self.port
+        if self.identity is not None:
+            port = find_port(self.identity, preferred=self.port, exclude=exclude)
+            if port is None:
+                raise OSError(f'{self.port} is not plugged in')
+        self.close()
+        self.serial_port = open_transport(port, self.baudrate)
+        self.port = port
+        self.framer.resync()
+        # The sensor may have restarted its own clock
+        self.device_clock.reset()
+        self.last_gap = time.monotonic() - self.lost_at if self.lost_at is not None else 0.0
+        self.lost_at = None
+        self.error = None
+        self.reconnects += 1
+        self._gap_flag = FLAG_GAP
+
+    @property
+    def is_open(self):
+        return self.serial_port.is_open
+
+    def close(self):
+        try:
+            self.serial_port.close()
+        except Exception:
+            pass
@@ -1,120 +1,89 @@
+import time
+# Reference point for the --profile-startup report
+STARTUP_T0 = time.perf_counter()
 import sys
-import serial
 import serial.tools.list_ports
-import re
 from datetime import datetime
-from collections import deque
-from statistics import mean
+from collections import defaultdict
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QComboBox, QPushButton, QLabel, QFrame, QGridLayout, QFileDialog, QLineEdit)
-from PyQt6.QtCore import QTimer, Qt
-from PyQt6.QtGui import QFont, QPixmap
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import csv
+from PyQt6.QtCore import QTimer, Qt, QThread, pyqtSignal
+from PyQt6.QtGui import QFont, QPixmap, QKeySequence, QShortcut
 import os
-from scipy.interpolate import make_interp_spline
-import numpy as np
+import shutil
+from acquisition import Acquisition, RECORDING_DIR, default_recording_name
+from capture import CaptureSink, capture_to_csv
+from transports import SYNTHETIC_SCHEME
+from metrics import METRICS, MetricsLog, format_snapshot
+from stream_stats import FILTERS, make_filter
+from alarms import rules_from_spec
 
-class TemperaturePlotCanvas(FigureCanvas):
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = fig.add_subplot(111)
-        super().__init__(fig)
-        self.setParent(parent)
-        self.temps = []
-        self.seconds = []
-        self.axes.set_title('Temperature History')
-        self.axes.set_xlabel('Sample #')
-        self.axes.set_ylabel('°C')
-        self.axes.grid(True)
-        self.line, = self.axes.plot([], [], color='#00A4E3', linewidth=2)
-        self.fig = fig
+class CsvExport(QThread):
+    # Converts a finished capture to CSV off the GUI thread; the capture is
+    # only deleted once the CSV is complete
+    done = pyqtSignal(str, str)
 
-    def update_plot(self, temp, elapsed_sec=None):
-        self.temps.append(temp)
-        if elapsed_sec is not None:
-            self.seconds.append(elapsed_sec)
-            self.line.set_data(self.seconds, self.temps)
-            self.axes.set_xlim(0, max(20, int(self.seconds[-1]) + 1))
-            # Dynamic x-tick interval
-            max_sec = int(self.seconds[-1]) if self.seconds else 0
-            if max_sec <= 120:
-                tick_interval = 10
-            elif max_sec <= 300:
-                tick_interval = 30
-            elif max_sec <= 600:
-                tick_interval = 60
-            else:
-                tick_interval = 120
-            self.axes.set_xticks(list(range(0, max_sec + tick_interval, tick_interval)))
-            self.axes.set_xticklabels([str(x) for x in range(0, max_sec + tick_interval, tick_interval)])
-            if self.temps:
-                min_temp = min(self.temps)
-                max_temp = max(self.temps)
-                if min_temp == max_temp:
-                    min_temp -= 1
-                    max_temp += 1
-                self.axes.set_ylim(min_temp-1, max_temp+1)
-            self.draw()
-        else:
-            self.line.set_data(range(len(self.temps)), self.temps)
-            self.axes.set_xlim(0, max(20, len(self.temps)))
-            self.axes.set_xticks([])
-            if self.temps:
-                min_temp = min(self.temps)
-                max_temp = max(self.temps)
-                if min_temp == max_temp:
-                    min_temp -= 1
-                    max_temp += 1
-                self.axes.set_ylim(min_temp-1, max_temp+1)
-            self.draw()
-
-    def clear_plot(self):
-        self.temps = []
-        self.seconds = []
-        self.line.set_data([], [])
-        self.axes.set_xlim(0, 20)
-        self.axes.set_ylim(0, 50)
-        self.draw()
+    def __init__(self, src, dst, parent=None):
+        super().__init__(parent)
+        self.src = src
+        self.dst = dst
 
-    def plot_full_data(self, times, temps, save_path=None):
-        self.axes.clear()
-        self.axes.set_title('Collected Temperature Data')
-        self.axes.set_xlabel('Time')
-        self.axes.set_ylabel('°C')
-        self.axes.grid(True)
-        self.axes.plot(range(len(temps)), temps, color='#00A4E3', linewidth=2)
-        self.axes.set_xlim(0, max(20, len(temps)))
-        if temps:
-            min_temp = min(temps)
-            max_temp = max(temps)
-            if min_temp == max_temp:
-                min_temp -= 1
-                max_temp += 1
-            self.axes.set_ylim(min_temp-1, max_temp+1)
-        self.fig.tight_layout()
-        self.draw()
-        if save_path:
-            self.fig.savefig(save_path)
+    def run(self):
+        try:
+            capture_to_csv(self.src, self.dst)
+            os.remove(self.src)
+        except OSError as e:
+            self.done.emit(self.dst, str(e))
+        else:
+            self.done.emit(self.dst, '')
 
 class SerialTerminal(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.serial_port = None
-        self.temp_buffer = deque(maxlen=10)
+        # Serial ports, parsing, calibration and recording live in the
+        # Qt-free acquisition core; the window only displays what it pumps out
+        self.acquisition = Acquisition()
+        # Plot smoothing per channel; the default matches the old 10-sample mean
+        self.plot_filter = 'mean-10'
+        self.plot_filters = defaultdict(lambda: make_filter(self.plot_filter))
         self.last_valid_temp = None
+        # Channel shown in the big Celsius/Fahrenheit displays
+        self.display_channel = 0
         self.collecting = False
-        self.collected_times = []
-        self.collected_temps = []
-        self.collected_seconds = []
+        self.recording_dir = RECORDING_DIR
         self.calibration_offset = 0.0
-        self.collection_start_time = None
         self.temp_display_c = None  # Celsius display
         self.temp_display_f = None  # Fahrenheit display
+        # matplotlib is only imported once the window is up; see load_plot
+        self._temp_plot = None
+        # Periodic JSON metrics file, set up by --metrics-log
+        self.metrics_log = None
+        # Open review windows (Open Recording…)
+        self.review_windows = []
+        # CSV conversions still running after Stop & Export
+        self.exports = []
         self.initUI()
         # Maximize window on launch
         self.showMaximized()
+        QTimer.singleShot(0, self.load_plot)
+
+    @property
+    def temp_plot(self):
+        if self._temp_plot is None:
+            self.load_plot()
+        return self._temp_plot
+
+    def load_plot(self):
+        if self._temp_plot is not None:
+            return
+        from plot_canvas import TemperaturePlotCanvas
+        self._temp_plot = TemperaturePlotCanvas(width=5, height=4, dpi=100, max_fps=20)
+        for channel, reader in self.acquisition.readers.items():
+            self._temp_plot.set_channel_label(channel, reader.port)
+        layout = self.plot_frame.layout()
+        layout.removeWidget(self.plot_placeholder)
+        self.plot_placeholder.deleteLater()
+        layout.addWidget(self._temp_plot)
         
     def initUI(self):
         self.setWindowTitle('Temperature Playground')
@@ -219,6 +188,9 @@ class SerialTerminal(QMainWindow):
         control_layout.setSpacing(15)
         control_layout.addWidget(QLabel('Serial Port:'), 0, 0)
         self.port_combo = QComboBox()
+        # Editable so replay:// and sim:// ports can be typed in
+        self.port_combo.setEditable(True)
+        self.port_combo.setToolTip('Serial port, sim:// for a simulated sensor, or replay://<file> to replay a recording')
         self.refresh_ports()
         control_layout.addWidget(self.port_combo, 0, 1)
         control_layout.addWidget(QLabel('Baud Rate:'), 0, 2)
@@ -238,16 +210,47 @@ class SerialTerminal(QMainWindow):
         refresh_btn = QPushButton('Refresh Ports')
         refresh_btn.clicked.connect(self.refresh_ports)
         control_layout.addWidget(refresh_btn, 0, 7)
+        # Extra sensors are opened alongside the first one and plotted as their own channel
+        self.add_port_btn = QPushButton('Add Port')
+        self.add_port_btn.setToolTip('Also monitor the selected port, with the current baud rate and offset')
+        self.add_port_btn.clicked.connect(self.add_port)
+        self.add_port_btn.setEnabled(False)
+        control_layout.addWidget(self.add_port_btn, 0, 8)
         # Start/Stop buttons
         self.start_btn = QPushButton('Start Collecting')
         self.start_btn.setObjectName('startBtn')
         self.start_btn.clicked.connect(self.start_collecting)
-        control_layout.addWidget(self.start_btn, 1, 0, 1, 4)
+        control_layout.addWidget(self.start_btn, 1, 0, 1, 5)
         self.stop_btn = QPushButton('Stop & Export')
         self.stop_btn.setObjectName('stopBtn')
         self.stop_btn.clicked.connect(self.stop_and_export)
         self.stop_btn.setEnabled(False)
-        control_layout.addWidget(self.stop_btn, 1, 4, 1, 4)
+        control_layout.addWidget(self.stop_btn, 1, 5, 1, 3)
+        open_btn = QPushButton('Open Recording…')
+        open_btn.setToolTip('Browse a finished CSV or capture file')
+        open_btn.clicked.connect(self.open_recording)
+        control_layout.addWidget(open_btn, 1, 8)
+        # Smoothing for the plot, and for what gets recorded
+        control_layout.addWidget(QLabel('Plot Filter:'), 2, 0)
+        self.plot_filter_combo = QComboBox()
+        self.plot_filter_combo.addItems(list(FILTERS))
+        self.plot_filter_combo.setCurrentText(self.plot_filter)
+        self.plot_filter_combo.currentTextChanged.connect(self.set_plot_filter)
+        control_layout.addWidget(self.plot_filter_combo, 2, 1)
+        control_layout.addWidget(QLabel('Recording Filter:'), 2, 2)
+        self.record_filter_combo = QComboBox()
+        self.record_filter_combo.addItems(list(FILTERS))
+        self.record_filter_combo.setCurrentText(self.acquisition.record_filter)
+        self.record_filter_combo.setToolTip('Applied to the samples before they are recorded and displayed')
+        self.record_filter_combo.currentTextChanged.connect(self.acquisition.set_record_filter)
+        control_layout.addWidget(self.record_filter_combo, 2, 3)
+        control_layout.addWidget(QLabel('Alarms:'), 2, 4)
+        self.alarm_input = QLineEdit('')
+        self.alarm_input.setPlaceholderText('e.g. high=80,low=5,slope=2,stale=10')
+        self.alarm_input.setToolTip('high/low limits in °C, slope in °C/s, stale in seconds; '
+                                    'hysteresis (°C) and window (s) are optional')
+        self.alarm_input.editingFinished.connect(self.update_alarms)
+        control_layout.addWidget(self.alarm_input, 2, 5, 1, 4)
         main_layout.addWidget(control_frame)
         # Main content: temperature + plot
         content_layout = QHBoxLayout()
@@ -264,6 +267,13 @@ class SerialTerminal(QMainWindow):
         """)
         temp_layout = QVBoxLayout(temp_frame)
         temp_layout.setSpacing(10)
+        # Shown while any alarm is raised
+        self.alarm_banner = QLabel()
+        self.alarm_banner.setFont(QFont('Arial', 14, QFont.Weight.Bold))
+        self.alarm_banner.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.alarm_banner.setStyleSheet('QLabel { background-color: #F44336; color: white; border-radius: 8px; padding: 8px; }')
+        self.alarm_banner.setVisible(False)
+        temp_layout.addWidget(self.alarm_banner)
         status_layout = QHBoxLayout()
         self.status_label = QLabel('Status: Disconnected')
         self.status_label.setFont(QFont('Arial', 12))
@@ -340,9 +350,13 @@ class SerialTerminal(QMainWindow):
         temp_displays_layout.addWidget(fahrenheit_frame)
         
         temp_layout.addLayout(temp_displays_layout)
+        # Running session statistics of the displayed channel
+        self.stats_label = QLabel('Min --.-  Avg --.-  Max --.-')
+        self.stats_label.setFont(QFont('Arial', 14))
+        self.stats_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        temp_layout.addWidget(self.stats_label)
         content_layout.addWidget(temp_frame, 2)
         # Temperature plot
-        self.temp_plot = TemperaturePlotCanvas(width=5, height=4, dpi=100)
         self.plot_frame = QFrame()
         self.plot_frame.setStyleSheet("""
             QFrame {
@@ -354,7 +368,9 @@ class SerialTerminal(QMainWindow):
         """)
         plot_layout = QVBoxLayout(self.plot_frame)
         plot_layout.setContentsMargins(0, 0, 0, 0)
-        plot_layout.addWidget(self.temp_plot)
+        self.plot_placeholder = QLabel('Loading plot...')
+        self.plot_placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        plot_layout.addWidget(self.plot_placeholder)
         content_layout.addWidget(self.plot_frame, 3)
         main_layout.addLayout(content_layout)
         # Dedicated area for the final picture (always visible, below plot)
@@ -364,37 +380,64 @@ class SerialTerminal(QMainWindow):
         self.image_label.setStyleSheet('background: #fff; border: 1px solid #E0E0E0; border-radius: 8px;')
         self.image_label.setVisible(False)
         main_layout.addWidget(self.image_label)
+        # Performance overlay, toggled with F3; timing is only measured while it (or the metrics log) is on
+        self.metrics_overlay = QLabel(central_widget)
+        self.metrics_overlay.setFont(QFont('Courier New', 9))
+        self.metrics_overlay.setStyleSheet('background-color: rgba(0, 0, 0, 180); color: #E0E0E0; padding: 6px; border-radius: 4px;')
+        self.metrics_overlay.move(10, 10)
+        self.metrics_overlay.setVisible(False)
+        QShortcut(QKeySequence('F3'), self, activated=self.toggle_metrics_overlay)
         # Timers
         self.timer = QTimer()
-        self.timer.timeout.connect(self.read_serial)
+        self.timer.timeout.connect(self.drain_samples)
         self.clock_timer = QTimer()
         self.clock_timer.timeout.connect(self.update_time)
         self.clock_timer.start(1000)
         self.update_time()
     def update_time(self):
+        timed = METRICS.enabled
+        if timed:
+            t0 = time.perf_counter()
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         self.time_label.setText(f'Time: {current_time}')
+        if self.metrics_overlay.isVisible():
+            self.metrics_overlay.setText(format_snapshot(self.acquisition.metrics_snapshot()))
+            self.metrics_overlay.adjustSize()
+            self.metrics_overlay.raise_()
+        if self.metrics_log is not None:
+            self.metrics_log.maybe_write(self.acquisition.metrics_snapshot)
+        if timed:
+            METRICS.observe('clock_tick_ms', (time.perf_counter() - t0) * 1000)
+    def toggle_metrics_overlay(self):
+        visible = not self.metrics_overlay.isVisible()
+        self.metrics_overlay.setVisible(visible)
+        METRICS.enabled = visible or self.metrics_log is not None
+        if visible:
+            self.update_time()
+    def start_metrics_log(self, path, interval=10.0):
+        self.metrics_log = MetricsLog(path, interval)
+        METRICS.enabled = True
     def refresh_ports(self):
         self.port_combo.clear()
         ports = [port.device for port in serial.tools.list_ports.comports()]
         self.port_combo.addItems(ports)
+        self.port_combo.addItem(SYNTHETIC_SCHEME)
     def toggle_connection(self):
-        if self.serial_port is None or not self.serial_port.is_open:
+        if not self.acquisition.connected:
             try:
-                self.serial_port = serial.Serial(
-                    port=self.port_combo.currentText(),
-                    baudrate=int(self.baud_combo.currentText()),
-                    timeout=0.1
+                self.display_channel = self.acquisition.connect(
+                    self.port_combo.currentText(),
+                    int(self.baud_combo.currentText()),
+                    calibration_offset=self.calibration_offset
                 )
+                self.temp_plot.set_channel_label(self.display_channel, self.port_combo.currentText())
                 self.connect_btn.setText('Disconnect')
+                self.add_port_btn.setEnabled(True)
                 self.timer.start(50)
                 self.status_label.setText('Status: Connected')
                 self.status_label.setStyleSheet('color: #4CAF50;')
-                self.temp_buffer.clear()
+                self.plot_filters.clear()
                 self.last_valid_temp = None
-                self.collected_times.clear()
-                self.collected_temps.clear()
-                self.collected_seconds.clear()
                 self.collecting = False
                 self.start_btn.setEnabled(True)
                 self.stop_btn.setEnabled(False)
@@ -403,36 +446,58 @@ class SerialTerminal(QMainWindow):
                 self.status_label.setText(f'Error: {str(e)}')
                 self.status_label.setStyleSheet('color: #F44336;')
         else:
-            self.serial_port.close()
+            if self.acquisition.collecting:
+                # Keep what was recorded so far
+                recorded_path = self.acquisition.stop_collecting()
+                self.collecting = False
+                self.reset_plot_frame()
+            else:
+                recorded_path = None
+            self.acquisition.disconnect()
             self.timer.stop()
             self.connect_btn.setText('Connect')
+            self.add_port_btn.setEnabled(False)
             self.status_label.setText('Status: Disconnected')
             self.status_label.setStyleSheet('color: #F44336;')
             self.temp_display_c.setText('--.-')
             self.temp_display_f.setText('--.-')
+            self.stats_label.setText('Min --.-  Avg --.-  Max --.-')
             self.temp_plot.clear_plot()
             self.start_btn.setEnabled(False)
             self.stop_btn.setEnabled(False)
             self.image_label.setVisible(False)
-    def is_valid_temperature(self, temp):
-        return -40 <= temp <= 125
+            if recorded_path is not None:
+                self.status_label.setText(f'Status: Disconnected (recording kept at {recorded_path})')
+    def add_port(self):
+        if not self.acquisition.connected:
+            return
+        port = self.port_combo.currentText()
+        if any(reader.port == port for reader in self.acquisition.readers.values()):
+            self.status_label.setText(f'{port} is already open')
+            return
+        try:
+            channel = self.acquisition.add_port(port, int(self.baud_combo.currentText()), calibration_offset=self.calibration_offset)
+        except Exception as e:
+            self.status_label.setText(f'Error: {str(e)}')
+            self.status_label.setStyleSheet('color: #F44336;')
+            return
+        self.temp_plot.set_channel_label(channel, port)
+        ports = ', '.join(reader.port for reader in self.acquisition.readers.values())
+        self.status_label.setText(f'Status: Connected ({ports})')
+        self.status_label.setStyleSheet('color: #4CAF50;')
     def start_collecting(self):
-        self.collected_times.clear()
-        self.collected_temps.clear()
-        self.collected_seconds.clear()
         self.collecting = True
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.image_label.setVisible(False)
         # Clear the plot for new session
-        self.temp_plot.axes.clear()
-        self.temp_plot.axes.set_title('Temperature History')
-        self.temp_plot.axes.set_xlabel('Seconds')
-        self.temp_plot.axes.set_ylabel('°C')
-        self.temp_plot.axes.grid(True)
-        self.temp_plot.line, = self.temp_plot.axes.plot([], [], color='#00A4E3', linewidth=2)
-        self.temp_plot.clear_plot()
-        self.collection_start_time = datetime.now()
+        self.temp_plot.reset(xlabel='Seconds')
+        try:
+            self.acquisition.start_collecting(os.path.join(self.recording_dir, default_recording_name()))
+        except OSError as e:
+            self.acquisition.start_collecting()
+            self.status_label.setText(f'Error: recording disabled ({str(e)})')
+            self.status_label.setStyleSheet('color: #F44336;')
         # Add a blue glow to the plot area during collection
         self.plot_frame.setStyleSheet("""
             QFrame {
@@ -443,27 +508,90 @@ class SerialTerminal(QMainWindow):
                 box-shadow: 0 0 24px #00A4E3;
             }
         """)
+    def set_plot_filter(self, name):
+        self.plot_filter = name
+        self.plot_filters.clear()
+    def update_alarms(self):
+        try:
+            rules = rules_from_spec(self.alarm_input.text())
+        except ValueError as e:
+            self.status_label.setText(f'Error: {str(e)}')
+            self.status_label.setStyleSheet('color: #F44336;')
+            return
+        self.acquisition.alarms.set_rules(rules)
+        self.update_alarm_banner()
+    def update_alarm_banner(self):
+        labels = {reader.channel: reader.port for reader in self.acquisition.readers.values()}
+        active = [f'{labels.get(channel, channel)} {rule.describe()}' for rule, channel in self.acquisition.alarms.active_alarms()]
+        self.alarm_banner.setText('ALARM: ' + ', '.join(active))
+        self.alarm_banner.setVisible(bool(active))
     def update_calibration(self):
         try:
             self.calibration_offset = float(self.calib_input.text())
         except ValueError:
             self.calibration_offset = 0.0
             self.calib_input.setText('0.0')
+        # Applies to the port selected in the dropdown, or the first port
+        channel = self.display_channel
+        for reader in self.acquisition.readers.values():
+            if reader.port == self.port_combo.currentText():
+                channel = reader.channel
+        self.acquisition.set_calibration(channel, self.calibration_offset)
     def stop_and_export(self):
         self.collecting = False
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
-        if not self.collected_times or not self.collected_temps or not hasattr(self, 'collected_seconds'):
+        # The session is already on disk; finalize it, then move it wherever the user wants it
+        recorded_path = self.acquisition.stop_collecting()
+        if recorded_path is None:
             return
-        # Export to CSV
-        default_name = f"temperature_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        save_path, _ = QFileDialog.getSaveFileName(self, "Save CSV", default_name, "CSV Files (*.csv)")
-        if save_path:
-            with open(save_path, 'w', newline='') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Seconds', 'Temperature (°C)', 'Temperature (°F)', 'Timestamp'])
-                for sec, temp, t in zip(self.collected_seconds, self.collected_temps, self.collected_times):
-                    writer.writerow([sec, temp, temp * 1.8 + 32, t])
+        default_path = os.path.splitext(recorded_path)[0] + '.csv'
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, "Save CSV", default_path, "CSV Files (*.csv);;Capture Files (*.tpcap)")
+        try:
+            if not save_path:
+                self.status_label.setText(f'Recording kept at {recorded_path}')
+            elif save_path.lower().endswith(CaptureSink.extension):
+                if os.path.abspath(save_path) != os.path.abspath(recorded_path):
+                    shutil.move(recorded_path, save_path)
+            else:
+                export = CsvExport(recorded_path, save_path, self)
+                export.done.connect(self.export_done)
+                self.exports.append(export)
+                export.start()
+                self.status_label.setText(f'Exporting {os.path.basename(save_path)}…')
+        except OSError as e:
+            self.status_label.setText(f'Error: {str(e)} (recording kept at {recorded_path})')
+            self.status_label.setStyleSheet('color: #F44336;')
+        self.reset_plot_frame()
+    def open_recording(self, path=None):
+        if not path:
+            path, _ = QFileDialog.getOpenFileName(
+                self, "Open Recording", RECORDING_DIR, "Recordings (*.tpcap *.csv);;All Files (*)")
+            if not path:
+                return
+        # Needs matplotlib, like the live plot; imported on first use
+        from review_window import ReviewWindow
+        try:
+            window = ReviewWindow(path)
+        except (OSError, ValueError, IndexError) as e:
+            self.status_label.setText(f'Error: cannot open {os.path.basename(path)} ({str(e)})')
+            self.status_label.setStyleSheet('color: #F44336;')
+            return
+        # Kept referenced for as long as it is open
+        self.review_windows = [w for w in self.review_windows if w.isVisible()] + [window]
+        window.show()
+    def export_done(self, path, error):
+        export = self.sender()
+        if export in self.exports:
+            self.exports.remove(export)
+            export.wait()
+        if error:
+            self.status_label.setText(f'Error: {error} (recording kept at {export.src})')
+            self.status_label.setStyleSheet('color: #F44336;')
+        else:
+            self.status_label.setText(f'Exported {os.path.basename(path)}')
+    def reset_plot_frame(self):
         # Remove the blue glow from the plot area after collection
         self.plot_frame.setStyleSheet("""
             QFrame {
@@ -475,45 +603,95 @@ class SerialTerminal(QMainWindow):
         """)
         self.image_label.clear()
         self.image_label.setVisible(False)
-    def read_serial(self):
-        if self.serial_port and self.serial_port.is_open:
-            try:
-                while self.serial_port.in_waiting:
-                    line = self.serial_port.readline()
-                    try:
-                        text = line.decode('ascii', errors='replace').strip()
-                        temp_pattern = r'(?:temp:?\s*)?(-?\d+\.?\d*)(?:\s*°?[Cc])?'
-                        matches = re.findall(temp_pattern, text)
-                        if matches:
-                            temp = float(matches[-1])
-                            if self.is_valid_temperature(temp):
-                                calibrated_temp = temp + self.calibration_offset
-                                self.temp_display_c.setText(f'{calibrated_temp:.2f}')
-                                self.temp_display_f.setText(f'{calibrated_temp * 1.8 + 32:.2f}')
-                                self.last_valid_temp = calibrated_temp
-                                # Optional: keep smoothing for the plot only
-                                self.temp_buffer.append(calibrated_temp)
-                                if self.collecting:
-                                    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                    self.collected_times.append(now)
-                                    self.collected_temps.append(calibrated_temp)
-                                    elapsed_sec = (datetime.strptime(now, '%Y-%m-%d %H:%M:%S') - self.collection_start_time).total_seconds()
-                                    self.collected_seconds.append(round(elapsed_sec, 2))
-                                    self.temp_plot.update_plot(mean(self.temp_buffer), elapsed_sec=round(elapsed_sec, 2))
-                    except Exception:
-                        pass
-            except Exception as e:
-                self.status_label.setText(f'Error: {str(e)}')
-                self.status_label.setStyleSheet('color: #F44336;')
-                self.toggle_connection()
+    def drain_samples(self):
+        if not self.acquisition.connected:
+            return
+        timed = METRICS.enabled
+        if timed:
+            t0 = time.perf_counter()
+        # Everything the ports queued since the last refresh, in one batch;
+        # samples arrive calibrated, tagged by channel and already recorded
+        updated = False
+        for elapsed_sec, calibrated_temp, channel in self.acquisition.pump():
+            if channel == self.display_channel:
+                self.last_valid_temp = calibrated_temp
+                updated = True
+            # Smoothing for the plot only
+            smoothed = self.plot_filters[channel].filter(calibrated_temp)
+            if elapsed_sec is not None:
+                self.temp_plot.update_plot(smoothed, elapsed_sec=elapsed_sec, channel=channel)
+        if updated:
+            self.temp_display_c.setText(f'{self.last_valid_temp:.2f}')
+            self.temp_display_f.setText(f'{self.last_valid_temp * 1.8 + 32:.2f}')
+            stats = self.acquisition.stats.get(self.display_channel)
+            if stats is not None and stats.count:
+                self.stats_label.setText(f'Min {stats.min:.2f}  Avg {stats.mean:.2f}  Max {stats.max:.2f} °C   {stats.rate:.1f} samples/s')
+        recorder = self.acquisition.recorder
+        if recorder is not None and recorder.error is not None:
+            self.status_label.setText(f'Error: recording failed ({str(recorder.error)})')
+            self.status_label.setStyleSheet('color: #F44336;')
+        for reader in self.acquisition.take_failures():
+            self.status_label.setText(f'Error on {reader.port}: {str(reader.error)}')
+            self.status_label.setStyleSheet('color: #F44336;')
+        # Lost ports are reopened in the background; the session carries on
+        for reader in self.acquisition.take_reconnects():
+            self.status_label.setText(f'Status: Reconnected to {reader.port} after {reader.last_gap:.1f} s')
+            self.status_label.setStyleSheet('color: #4CAF50;')
+        lost = self.acquisition.reconnecting
+        if lost:
+            now = time.monotonic()
+            self.status_label.setText('Reconnecting: ' + ', '.join(
+                f'{reader.port} lost {now - (reader.lost_at or now):.0f} s ago ({str(reader.error)})' for reader in lost))
+            self.status_label.setStyleSheet('color: #FF9800;')
+        if self.acquisition.alarms.take_events() or self.alarm_banner.isVisible():
+            self.update_alarm_banner()
+        if timed:
+            METRICS.observe('drain_ms', (time.perf_counter() - t0) * 1000)
+        readers = self.acquisition.readers
+        if not readers:
+            self.toggle_connection()
+        elif self.display_channel not in readers:
+            self.display_channel = min(readers)
     def closeEvent(self, event):
-        if self.serial_port and self.serial_port.is_open:
-            self.serial_port.close()
+        # Finalizes any recording in progress before the ports are closed
+        self.acquisition.close()
+        if self.metrics_log is not None:
+            self.metrics_log.close()
+        # Let running exports finish rather than leave half a CSV behind
+        for export in self.exports:
+            export.wait()
         event.accept()
+def option_value(name, default=None):
+    # Value following name on the command line
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+def report_startup(stage, quit=False):
+    # Read by startup_profile from the --startup-exit child process
+    print(f'startup {stage} {(time.perf_counter() - STARTUP_T0) * 1000:.1f}', flush=True)
+    if quit:
+        QApplication.instance().exit(0)
 if __name__ == '__main__':
-    import matplotlib
-    matplotlib.use('Qt5Agg')
+    if '--profile-startup' in sys.argv:
+        import startup_profile
+        sys.exit(startup_profile.main(sys.argv[1:]))
     app = QApplication(sys.argv)
+    startup_exit = '--startup-exit' in sys.argv
+    if startup_exit:
+        # Queued ahead of the window's own load_plot
+        QTimer.singleShot(0, lambda: report_startup('window'))
     terminal = SerialTerminal()
+    metrics_log = option_value('--metrics-log')
+    if metrics_log is not None:
+        terminal.start_metrics_log(metrics_log, float(option_value('--metrics-interval', 10.0)))
+    publish = option_value('--publish')
+    if publish is not None:
+        terminal.acquisition.start_publisher(publish, format=option_value('--publish-format', 'json'),
+                                             drop=option_value('--publish-drop', 'oldest'))
     terminal.show()
+    review = option_value('--review')
+    if review is not None:
+        terminal.open_recording(review)
+    if startup_exit:
+        QTimer.singleShot(0, lambda: report_startup('plot', quit=True))
     sys.exit(app.exec()) 
\ No newline at end of file
@@ -0,0 +1,226 @@
+import selectors
+import threading
+import time
+from collections import deque
+
+from serial_reader import PortReader, SampleQueue
+
+
+class Reconnector(threading.Thread):
+    # Reopens lost ports in the background, retrying with exponential
+    # backoff, so neither the I/O thread nor the GUI ever waits on a device
+    # that is gone. A reopened reader is handed back to the SessionManager
+    # and carries on as the same channel.
+    def __init__(self, manager, initial_delay=0.5, max_delay=10.0):
+        super().__init__(name='Reconnector', daemon=True)
+        self.manager = manager
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self._incoming = deque()
+        # reader -> (attempts so far, monotonic time of the next attempt)
+        self._waiting = {}
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+
+    @property
+    def waiting(self):
+        return list(self._waiting)
+
+    def submit(self, reader):
+        self._incoming.append(reader)
+        self._wakeup.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            while self._incoming:
+                self._waiting[self._incoming.popleft()] = (0, time.monotonic() + self.initial_delay)
+            now = time.monotonic()
+            for reader, (attempts, due) in list(self._waiting.items()):
+                if self.manager.readers.get(reader.channel) is not reader:
+                    # Removed by the user meanwhile
+                    del self._waiting[reader]
+                    continue
+                if due <= now:
+                    self._attempt(reader, attempts + 1)
+            due = min((due for _, due in self._waiting.values()), default=now + 1.0)
+            self._wakeup.wait(max(0.0, due - time.monotonic()))
+            self._wakeup.clear()
+        for reader in self._waiting:
+            reader.close()
+
+    def _attempt(self, reader, attempts):
+        try:
+            # Never take over a device another channel has (or had) open
+            reader.reopen(exclude={other.port for other in list(self.manager.readers.values()) if other is not reader})
+        except Exception as e:
+            reader.error = e
+            delay = min(self.max_delay, self.initial_delay * 2 ** attempts)
+            self._waiting[reader] = (attempts, time.monotonic() + delay)
+            return
+        del self._waiting[reader]
+        self.manager.restore(reader)
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+class SessionManager(threading.Thread):
+    # Services any number of serial ports from a single I/O thread. Ports
+    # that expose a file descriptor (POSIX) are waited on with a selector;
+    # the others (Windows COM ports) are polled every poll_interval. All
+    # samples go into one shared queue tagged with the port's channel id, so
+    # the GUI thread has a single queue to drain however many ports are open.
+    # With reconnect on, a port that fails stays in the session and is
+    # reopened by a Reconnector; otherwise it is dropped from it.
+    def __init__(self, queue=None, poll_interval=0.002, alarms=None, reconnect=True):
+        super().__init__(name='SessionManager', daemon=True)
+        self.queue = queue if queue is not None else SampleQueue()
+        self.poll_interval = poll_interval
+        self.alarms = alarms
+        self.readers = {}
+        self._selector = selectors.DefaultSelector()
+        self._selectable = 0
+        self._polled = []
+        # Port changes are applied by the I/O thread itself, between passes
+        self._pending = deque()
+        self._failed = deque()
+        self._restored = deque()
+        self.reconnector = Reconnector(self) if reconnect else None
+        self._next_channel = 0
+        self._stop_event = threading.Event()
+
+    @property
+    def queue_depth(self):
+        return self.queue.depth
+
+    @property
+    def dropped(self):
+        return self.queue.dropped
+
+    def add_port(self, port, baudrate, calibration_offset=0.0, parser=None):
+        channel = self._next_channel
+        reader = PortReader(port, baudrate, channel=channel, calibration_offset=calibration_offset, parser=parser,
+                            alarms=self.alarms)
+        self._next_channel += 1
+        if self.alarms is not None:
+            self.alarms.watch(channel, port)
+        self.readers[channel] = reader
+        self._pending.append(('add', reader))
+        return channel
+
+    def remove_port(self, channel):
+        reader = self.readers.pop(channel, None)
+        if reader is not None:
+            self._pending.append(('remove', reader))
+            if self.alarms is not None:
+                self.alarms.forget(channel)
+
+    def set_calibration(self, channel, offset):
+        reader = self.readers.get(channel)
+        if reader is not None:
+            reader.calibration_offset = offset
+
+    @property
+    def reconnecting(self):
+        # Readers currently lost and waiting to be reopened
+        return [reader for reader in list(self.readers.values()) if reader.lost_at is not None]
+
+    def take_failures(self):
+        # Readers that hit an I/O error since the last call; they are already
+        # closed and removed from the session.
+        failures = []
+        while self._failed:
+            failures.append(self._failed.popleft())
+        return failures
+
+    def take_reconnects(self):
+        # Readers reopened since the last call
+        restored = []
+        while self._restored:
+            restored.append(self._restored.popleft())
+        return restored
+
+    def restore(self, reader):
+        # Called by the Reconnector thread once a lost reader is open again
+        self._pending.append(('add', reader))
+        self._restored.append(reader)
+
+    def _apply_pending(self):
+        while self._pending:
+            op, reader = self._pending.popleft()
+            if op == 'add':
+                if self.readers.get(reader.channel) is not reader:
+                    # Removed while it was being reopened
+                    reader.close()
+                    continue
+                try:
+                    self._selector.register(reader.fileno(), selectors.EVENT_READ, reader)
+                    self._selectable += 1
+                except (AttributeError, OSError, ValueError):
+                    self._polled.append(reader)
+            else:
+                self._detach(reader)
+                reader.close()
+
+    def _detach(self, reader):
+        if reader in self._polled:
+            self._polled.remove(reader)
+            return
+        try:
+            self._selector.unregister(reader.fileno())
+            self._selectable -= 1
+        except (AttributeError, KeyError, OSError, ValueError):
+            pass
+
+    def _service(self, reader):
+        try:
+            return reader.poll(self.queue)
+        except Exception as e:
+            reader.error = e
+            self._detach(reader)
+            reader.close()
+            if self.reconnector is not None:
+                # Keeps its channel; its first sample once reopened is
+                # flagged alarms.FLAG_GAP
+                reader.lost_at = time.monotonic()
+                self.reconnector.submit(reader)
+            else:
+                self.readers.pop(reader.channel, None)
+                self._failed.append(reader)
+            return 0
+
+    def run(self):
+        if self.reconnector is not None:
+            self.reconnector.start()
+        try:
+            while not self._stop_event.is_set():
+                self._apply_pending()
+                timeout = self.poll_interval if self._polled else 0.05
+                if self._selectable:
+                    for key, _ in self._selector.select(timeout):
+                        self._service(key.data)
+                else:
+                    time.sleep(timeout)
+                for reader in list(self._polled):
+                    self._service(reader)
+                if self.alarms is not None:
+                    self.alarms.tick()
+        finally:
+            self._apply_pending()
+            for reader in list(self.readers.values()):
+                self._detach(reader)
+                reader.close()
+            self._selector.close()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.reconnector is not None:
+            self.reconnector.stop(timeout)
+        if self.is_alive():
+            self.join(timeout)
+        else:
+            for reader in self.readers.values():
+                reader.close()
@@ -0,0 +1,116 @@
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup report for the GUI: relaunches serial_terminal.py with import
+# profiling switched on, waits for its window and plot to come up, then
+# prints the slowest imports and the time-to-first-window.
+#
+#   python serial_terminal.py --profile-startup [--startup-budget MS] [--startup-top N]
+
+STARTUP_EXIT_FLAG = '--startup-exit'
+# "import time:      self [us] |  cumulative | imported package"
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(text):
+    # Returns [(module, self_us, cumulative_us, depth)] in import order
+    imports = []
+    for line in text.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return imports
+
+
+def top_level_imports(imports):
+    # Cumulative cost of each package imported directly (depth 0), summed
+    # by top-level package name
+    totals = {}
+    for module, _, cumulative_us, depth in imports:
+        if depth == 0:
+            name = module.split('.')[0]
+            totals[name] = totals.get(name, 0) + cumulative_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def child_command():
+    # A PyInstaller build is its own interpreter: relaunch the exe itself
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, STARTUP_EXIT_FLAG]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serial_terminal.py')
+    return [sys.executable, '-X', 'importtime', script, STARTUP_EXIT_FLAG]
+
+
+def measure(timeout=60.0):
+    # Launches the GUI once and returns (timings, imports). timings holds
+    # the wall-clock ms from process launch to 'window' and 'plot' (as seen
+    # by this process) and the child's own 'script_*' timestamps.
+    env = dict(os.environ)
+    # Also picked up by frozen builds that honour the environment
+    env['PYTHONPROFILEIMPORTTIME'] = '1'
+    timings = {}
+    with tempfile.TemporaryFile(mode='w+', encoding='utf-8', errors='replace') as err:
+        start = time.perf_counter()
+        child = subprocess.Popen(child_command(), stdout=subprocess.PIPE, stderr=err, env=env,
+                                 text=True, encoding='utf-8', errors='replace')
+        try:
+            for line in child.stdout:
+                # "startup <stage> <ms since serial_terminal.py started>"
+                parts = line.split()
+                if len(parts) == 3 and parts[0] == 'startup':
+                    timings[parts[1]] = (time.perf_counter() - start) * 1000
+                    timings['script_' + parts[1]] = float(parts[2])
+            child.wait(timeout)
+        finally:
+            if child.poll() is None:
+                child.kill()
+                child.wait()
+        timings['exit'] = (time.perf_counter() - start) * 1000
+        err.seek(0)
+        imports = parse_importtime(err.read())
+    if child.returncode:
+        raise RuntimeError(f'GUI exited with status {child.returncode} before its window came up')
+    return timings, imports
+
+
+def report(timings, imports, top=15, out=sys.stdout):
+    if imports:
+        total_us = sum(cumulative for _, _, cumulative, depth in imports if depth == 0)
+        print(f'Imports: {len(imports)} modules, {total_us / 1000:.1f} ms', file=out)
+        for name, cumulative_us in top_level_imports(imports)[:top]:
+            print(f'  {cumulative_us / 1000:8.1f} ms  {name}', file=out)
+    else:
+        print('Imports: no -X importtime output (frozen build?)', file=out)
+    for stage, label in (('window', 'First window'), ('plot', 'Plot ready')):
+        if stage in timings:
+            print(f'{label}: {timings[stage]:.1f} ms after launch '
+                  f'({timings["script_" + stage]:.1f} ms after the script started)', file=out)
+
+
+def main(argv):
+    budget_ms = None
+    top = 15
+    args = iter(argv)
+    for arg in args:
+        if arg == '--startup-budget':
+            budget_ms = float(next(args))
+        elif arg == '--startup-top':
+            top = int(next(args))
+    try:
+        timings, imports = measure()
+    except (OSError, RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 2
+    report(timings, imports, top=top)
+    if budget_ms is not None:
+        window_ms = timings.get('window')
+        if window_ms is None or window_ms > budget_ms:
+            print(f'Startup budget of {budget_ms:.0f} ms exceeded', file=sys.stderr)
+            return 1
+        print(f'Within startup budget of {budget_ms:.0f} ms')
+    return 0
@@ -0,0 +1,221 @@
+import math
+from bisect import bisect_left, insort
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# O(1)-per-sample session statistics and smoothing filters. Everything has
+# a per-sample path (update/filter) and a batch path (update_batch/
+# filter_batch) for when a whole queue drain arrives at once; both give the
+# same results and can be mixed freely.
+
+
+class RunningStats:
+    # Count, mean, variance (Welford), min, max and sample rate of a stream.
+    # Batches are merged with Chan's parallel variance formula.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.first_t = None
+        self.last_t = None
+
+    def update(self, value, t=None):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if t is not None:
+            if self.first_t is None:
+                self.first_t = t
+            self.last_t = t
+
+    def update_batch(self, values, times=None):
+        values = np.asarray(values, dtype=np.float64)
+        n_b = len(values)
+        if not n_b:
+            return
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n_a = self.count
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * n_a * n_b / n
+        self.count = n
+        low = float(values.min())
+        high = float(values.max())
+        if self.min is None or low < self.min:
+            self.min = low
+        if self.max is None or high > self.max:
+            self.max = high
+        if times is not None and len(times):
+            if self.first_t is None:
+                self.first_t = float(times[0])
+            self.last_t = float(times[-1])
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def rate(self):
+        # Samples per second over the time stamps seen so far
+        if self.count < 2 or self.first_t is None or self.last_t <= self.first_t:
+            return 0.0
+        return (self.count - 1) / (self.last_t - self.first_t)
+
+
+class NoFilter:
+    def filter(self, value):
+        return value
+
+    def filter_batch(self, values):
+        return np.asarray(values, dtype=np.float64)
+
+    def reset(self):
+        pass
+
+
+class MovingAverage:
+    # Mean of the last n samples (fewer at the start), from a running sum
+    def __init__(self, n=10):
+        self.n = n
+        self.reset()
+
+    def reset(self):
+        self._window = deque(maxlen=self.n)
+        self._sum = 0.0
+
+    def filter(self, value):
+        window = self._window
+        if len(window) == self.n:
+            self._sum -= window[0]
+        window.append(value)
+        self._sum += value
+        return self._sum / len(window)
+
+    def filter_batch(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return values
+        history = len(self._window)
+        full = np.concatenate((np.fromiter(self._window, np.float64, history), values))
+        sums = np.concatenate(([0.0], np.cumsum(full)))
+        end = np.arange(history + 1, len(full) + 1)
+        start = np.maximum(end - self.n, 0)
+        out = (sums[end] - sums[start]) / (end - start)
+        # Only the new values: the history is already in the window
+        self._window.extend(values[-self.n:].tolist())
+        # Re-summed from the window, so rounding never accumulates
+        self._sum = math.fsum(self._window)
+        return out
+
+
+class MedianFilter:
+    # Median of the last n samples (fewer at the start); knocks out single
+    # glitches that a mean would smear
+    def __init__(self, n=5):
+        self.n = n
+        self.reset()
+
+    def reset(self):
+        self._window = deque()
+        self._sorted = []
+
+    def filter(self, value):
+        window = self._window
+        ordered = self._sorted
+        if len(window) == self.n:
+            del ordered[bisect_left(ordered, window.popleft())]
+        window.append(value)
+        insort(ordered, value)
+        middle = len(ordered) // 2
+        if len(ordered) % 2:
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+
+    def filter_batch(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return values
+        n = self.n
+        history = len(self._window)
+        full = np.concatenate((np.fromiter(self._window, np.float64, history), values))
+        out = np.empty(len(values))
+        # Outputs whose window is still filling up
+        head = max(0, min(len(values), n - 1 - history))
+        for j in range(head):
+            out[j] = np.median(full[:history + j + 1])
+        if head < len(values):
+            windows = sliding_window_view(full, n)[history + head - (n - 1):]
+            out[head:] = np.median(windows, axis=1)
+        self.reset()
+        for value in full[-n:].tolist():
+            self._window.append(value)
+            insort(self._sorted, value)
+        return out
+
+
+class Ema:
+    # Exponential moving average; alpha is the weight of the newest sample
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.reset()
+
+    def reset(self):
+        self._value = None
+
+    def filter(self, value):
+        if self._value is None:
+            self._value = value
+        else:
+            self._value += self.alpha * (value - self._value)
+        return self._value
+
+    def filter_batch(self, values):
+        # A recurrence, so this one stays a (tight) loop
+        values = np.asarray(values, dtype=np.float64)
+        out = np.empty(len(values))
+        alpha = self.alpha
+        y = self._value
+        for i, value in enumerate(values.tolist()):
+            y = value if y is None else y + alpha * (value - y)
+            out[i] = y
+        self._value = y
+        return out
+
+
+FILTERS = {}
+
+
+def register_filter(name, factory):
+    # factory() returns a new filter with filter/filter_batch/reset
+    FILTERS[name] = factory
+
+
+def make_filter(name='none'):
+    try:
+        return FILTERS[name]()
+    except KeyError:
+        raise ValueError(f'Unknown filter: {name!r} (known: {", ".join(FILTERS)})') from None
+
+
+register_filter('none', NoFilter)
+register_filter('mean-10', lambda: MovingAverage(10))
+register_filter('median-5', lambda: MedianFilter(5))
+register_filter('ema-0.2', lambda: Ema(0.2))
@@ -0,0 +1,80 @@
+import re
+
+# Parsers take one raw line (bytes, without the trailing newline) and return a
+# float, or None when the line carries no reading. Parsers for sensors that
+# stamp their own readings return a (device_seconds, value) tuple instead.
+# They run on the reader thread for every line, so they work on bytes and
+# never decode to str.
+
+# Matches the three documented formats in a single call:
+#   temp: 25.5    25.5°C    25.5
+# The degree sign may arrive as UTF-8 (C2 B0) or Latin-1 (B0).
+_TEMP_LINE = re.compile(rb'\s*(?:temp:?\s*)?(-?\d+\.?\d*)\s*(?:\xc2?\xb0)?\s*[Cc]?\s*', re.IGNORECASE)
+_NUMBER = re.compile(rb'-?\d+\.?\d*')
+
+
+def parse_temperature(line):
+    match = _TEMP_LINE.fullmatch(line)
+    if match is not None:
+        return float(match.group(1))
+    # Anything else: keep the last number on the line
+    numbers = _NUMBER.findall(line)
+    if numbers:
+        return float(numbers[-1])
+    return None
+
+
+def make_csv_parser(column=0, delimiter=b','):
+    def parse_csv(line):
+        fields = line.split(delimiter)
+        try:
+            return float(fields[column])
+        except (IndexError, ValueError):
+            return None
+    return parse_csv
+
+
+def make_key_value_parser(key, separator=b'='):
+    if isinstance(key, str):
+        key = key.encode('ascii')
+    if isinstance(separator, str):
+        separator = separator.encode('ascii')
+    pattern = re.compile(rb'(?:^|[\s,;])' + re.escape(key) + rb'\s*' + re.escape(separator) + rb'\s*(-?\d+\.?\d*)')
+
+    def parse_key_value(line):
+        match = pattern.search(line)
+        if match is not None:
+            return float(match.group(1))
+        return None
+    return parse_key_value
+
+
+def make_timestamped_parser(time_column=0, value_column=1, delimiter=b',', time_scale=1e-3):
+    # e.g. "123456,25.5" from an Arduino printing millis() and a reading
+    def parse_timestamped(line):
+        fields = line.split(delimiter)
+        try:
+            return float(fields[time_column]) * time_scale, float(fields[value_column])
+        except (IndexError, ValueError):
+            return None
+    return parse_timestamped
+
+
+PARSERS = {}
+
+
+def register_parser(name, parser):
+    PARSERS[name] = parser
+
+
+def get_parser(name='temp'):
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise ValueError(f'Unknown line format: {name!r} (known: {", ".join(sorted(PARSERS))})') from None
+
+
+register_parser('temp', parse_temperature)
+register_parser('csv', make_csv_parser())
+register_parser('key=value', make_key_value_parser('temp'))
+register_parser('millis,temp', make_timestamped_parser())
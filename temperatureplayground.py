@@ -0,0 +1,178 @@
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+from acquisition import Acquisition, RECORDING_DIR, default_recording_name, jitter_summary
+from metrics import METRICS, MetricsLog, format_snapshot
+from stream_stats import FILTERS
+from publisher import DROP_POLICIES, FORMATS
+from alarms import LogAction, ShellAction, SocketAction, rules_from_spec
+from temp_parser import PARSERS
+
+# Headless entry point: records straight to disk through the acquisition
+# core, without importing Qt or matplotlib.
+#
+#   python temperatureplayground.py record --port COM3 --baud 115200 --out run.tpcap
+
+
+def parse_port_spec(spec, default_baud, default_offset):
+    # PORT[,BAUD[,OFFSET]]; sim:// and replay:// URLs are taken whole, as
+    # their options may contain commas (format=millis,temp)
+    if '://' in spec:
+        return spec, default_baud, default_offset
+    parts = spec.split(',')
+    port = parts[0]
+    baud = int(parts[1]) if len(parts) > 1 and parts[1] else default_baud
+    offset = float(parts[2]) if len(parts) > 2 and parts[2] else default_offset
+    return port, baud, offset
+
+
+def count_recorded(batch):
+    # Samples read before the session started come back with elapsed None
+    return sum(1 for elapsed, _, _ in batch if elapsed is not None)
+
+
+def record(args):
+    out = args.out or os.path.join(RECORDING_DIR, default_recording_name())
+    acquisition = Acquisition(record_filter=args.filter, reconnect=not args.no_reconnect)
+    metrics_log = MetricsLog(args.metrics_log, args.metrics_interval) if args.metrics_log else None
+    # Timing histograms are only worth their (small) cost when someone reads them
+    METRICS.enabled = bool(args.metrics_log or args.verbose)
+    alarms = acquisition.alarms
+    try:
+        alarms.set_rules(rules_from_spec(args.alarms or ''))
+        if args.alarm_log:
+            alarms.actions.append(LogAction(args.alarm_log))
+        if args.alarm_exec:
+            alarms.actions.append(ShellAction(args.alarm_exec))
+        if args.alarm_socket:
+            alarms.actions.append(SocketAction(args.alarm_socket))
+        if args.publish:
+            acquisition.start_publisher(args.publish, format=args.publish_format, drop=args.publish_drop)
+    except (OSError, ValueError) as e:
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        stop.set()
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_stop)
+
+    try:
+        for i, spec in enumerate(args.port):
+            port, baud, offset = parse_port_spec(spec, args.baud, args.offset)
+            if i == 0:
+                # Ports are opened now but only read once the session has started
+                acquisition.connect(port, baud, calibration_offset=offset, parser=args.format, start=False)
+            else:
+                acquisition.add_port(port, baud, calibration_offset=offset, parser=args.format)
+        acquisition.start_collecting(out)
+        acquisition.start_reading()
+    except Exception as e:
+        acquisition.close()
+        if metrics_log is not None:
+            metrics_log.close()
+        print(f'error: {e}', file=sys.stderr)
+        return 1
+
+    print(f'Recording {", ".join(args.port)} to {out} (Ctrl+C to stop)', file=sys.stderr)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    samples = 0
+    last_report = time.monotonic()
+    status = 0
+    lost = set()
+    while not stop.wait(args.interval):
+        samples += count_recorded(acquisition.pump())
+        for reader in acquisition.take_failures():
+            print(f'error on {reader.port}: {reader.error}', file=sys.stderr)
+        down = set(acquisition.reconnecting)
+        for reader in down - lost:
+            print(f'lost {reader.port} ({reader.error}), reconnecting', file=sys.stderr)
+        lost = down
+        for reader in acquisition.take_reconnects():
+            print(f'reconnected {reader.port} after {reader.last_gap:.1f} s', file=sys.stderr)
+        for event in alarms.take_events():
+            print(f'{"ALARM" if event.active else "clear"} {event.rule.name}: {event.message}', file=sys.stderr)
+        if not acquisition.readers:
+            status = 1
+            break
+        recorder = acquisition.recorder
+        if recorder is not None and recorder.error is not None:
+            print(f'error: recording failed ({recorder.error})', file=sys.stderr)
+            status = 1
+            break
+        if metrics_log is not None:
+            metrics_log.maybe_write(acquisition.metrics_snapshot)
+        now = time.monotonic()
+        if not args.quiet and now - last_report >= 5:
+            last_report = now
+            print(f'{samples} samples, {acquisition.queue.dropped} dropped', file=sys.stderr)
+            if args.verbose:
+                print(format_snapshot(acquisition.metrics_snapshot()), file=sys.stderr)
+        if deadline is not None and now >= deadline:
+            break
+
+    samples += count_recorded(acquisition.pump())
+    readers = {reader.channel: reader for reader in acquisition.readers.values()}
+    for channel, stats in sorted(acquisition.stats.items()):
+        if stats.count:
+            reader = readers.get(channel)
+            print(f'{reader.port if reader else channel}: min {stats.min:.2f}  avg {stats.mean:.2f}  max {stats.max:.2f} °C  '
+                  f'stdev {stats.stdev:.3f}  {stats.rate:.1f} samples/s', file=sys.stderr)
+            interval = jitter_summary(reader.jitter) if reader else None
+            if interval is not None:
+                print(f'  sample interval {interval["mean"]:.3f} ± {interval["stdev"]:.3f} ms '
+                      f'(min {interval["min"]:.3f}, max {interval["max"]:.3f})', file=sys.stderr)
+    if metrics_log is not None:
+        metrics_log.write(acquisition.metrics_snapshot())
+        metrics_log.close()
+    path = acquisition.close()
+    if path is None:
+        print('No samples recorded', file=sys.stderr)
+    else:
+        print(f'Saved {samples} samples to {path}', file=sys.stderr)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='temperatureplayground', description='Temperature Playground command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rec = commands.add_parser('record', help='record one or more serial sensors to disk without the GUI')
+    rec.add_argument('--port', action='append', required=True,
+                     help='serial port as PORT[,BAUD[,OFFSET]] (sim:// and replay:// URLs use --baud/--offset); '
+                          'repeat for several sensors')
+    rec.add_argument('--baud', type=int, default=9600, help='default baud rate (default: 9600)')
+    rec.add_argument('--offset', type=float, default=0.0, help='default calibration offset in °C')
+    rec.add_argument('--format', choices=sorted(PARSERS),
+                     help="line format (default: temp, or the sim:// port's own format)")
+    rec.add_argument('--filter', default='none', choices=list(FILTERS), help='filter applied before recording (default: none)')
+    rec.add_argument('--alarms', metavar='SPEC', help='alarm rules, e.g. high=80,low=5,slope=2,stale=10,hysteresis=0.5')
+    rec.add_argument('--alarm-log', metavar='PATH', help='append alarm changes to this file')
+    rec.add_argument('--alarm-exec', metavar='CMD', help='run this shell command on every alarm change (ALARM_* environment)')
+    rec.add_argument('--alarm-socket', metavar='PORT|PATH', help='send alarm changes as JSON datagrams to a local UDP port or Unix socket')
+    rec.add_argument('--publish', metavar='ADDRESS', help='serve the live samples on PORT, HOST:PORT or unix:PATH')
+    rec.add_argument('--publish-format', default='json', choices=FORMATS, help='newline JSON or binary frames (default: json)')
+    rec.add_argument('--publish-drop', default='oldest', choices=DROP_POLICIES,
+                     help='what a subscriber that falls behind loses (default: oldest)')
+    rec.add_argument('--no-reconnect', action='store_true', help='stop when a port fails instead of reopening it')
+    rec.add_argument('--out', help='output file; .csv for CSV, anything else for a binary capture (default: %s)' % RECORDING_DIR)
+    rec.add_argument('--duration', type=float, help='stop after this many seconds')
+    rec.add_argument('--interval', type=float, default=0.2, help='seconds between queue drains (default: 0.2)')
+    rec.add_argument('--quiet', action='store_true', help='no periodic progress output')
+    rec.add_argument('--verbose', action='store_true', help='add per-port counters and timings to the progress output')
+    rec.add_argument('--metrics-log', help='append a JSON metrics snapshot to this file every --metrics-interval seconds')
+    rec.add_argument('--metrics-interval', type=float, default=10.0, help='seconds between metrics snapshots (default: 10)')
+    rec.set_defaults(func=record)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import math
+import time
+
+
+class SessionClock:
+    # Samples are stamped with time.monotonic_ns() where they arrive. The
+    # clock anchors that monotonic timeline to a single wall-clock reading
+    # taken at start(), so elapsed times keep full resolution and are immune
+    # to NTP or DST steps, while exports can still show local time.
+    def __init__(self):
+        self.start_ns = None
+        self.start_epoch = None
+
+    def start(self):
+        self.start_epoch = time.time()
+        self.start_ns = time.monotonic_ns()
+
+    @property
+    def started(self):
+        return self.start_ns is not None
+
+    def elapsed(self, t_ns):
+        return (t_ns - self.start_ns) * 1e-9
+
+
+class DeviceClock:
+    # Maps device-supplied timestamps (seconds on the sensor's own clock) onto
+    # the host monotonic timeline. Transmission can only delay a sample, so
+    # the smallest arrival-minus-device offset seen so far is the best
+    # estimate of the clock offset. A device clock that goes backwards (a
+    # millis() reset or wrap) or falls more than `tolerance` seconds behind
+    # its arrival is re-anchored on that sample; stamps never go backwards.
+    def __init__(self, tolerance=2.0):
+        self.tolerance_ns = int(tolerance * 1e9)
+        self.reset()
+
+    def reset(self):
+        self.offset_ns = None
+        self.resyncs = 0
+        self._last_device_ns = None
+        self._last_host_ns = None
+
+    def to_host_ns(self, device_seconds, arrival_ns):
+        device_ns = int(device_seconds * 1e9)
+        offset = arrival_ns - device_ns
+        if self.offset_ns is None or offset < self.offset_ns:
+            self.offset_ns = offset
+        elif device_ns < self._last_device_ns or offset - self.offset_ns > self.tolerance_ns:
+            self.offset_ns = offset
+            self.resyncs += 1
+        host_ns = device_ns + self.offset_ns
+        if self._last_host_ns is not None and host_ns < self._last_host_ns:
+            host_ns = self._last_host_ns
+        self._last_device_ns = device_ns
+        self._last_host_ns = host_ns
+        return host_ns
+
+
+class JitterStats:
+    # Running statistics of the interval between consecutive timestamps
+    # (Welford's algorithm), in seconds.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self._last_ns = None
+
+    def restart(self):
+        # The next timestamp follows a gap; its interval is not counted
+        self._last_ns = None
+
+    def update(self, t_ns):
+        last = self._last_ns
+        self._last_ns = t_ns
+        if last is None:
+            return
+        interval = (t_ns - last) * 1e-9
+        self.count += 1
+        delta = interval - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (interval - self.mean)
+        if self.min is None or interval < self.min:
+            self.min = interval
+        if self.max is None or interval > self.max:
+            self.max = interval
+
+    @property
+    def stdev(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def rate(self):
+        return 1.0 / self.mean if self.mean > 0 else 0.0
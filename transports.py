@@ -0,0 +1,314 @@
+import csv
+import math
+import random
+import time
+
+import numpy as np
+import serial
+from serial.tools import list_ports
+
+from capture import MAGIC, open_capture
+
+# Byte sources a PortReader can read from. Besides real serial ports, two
+# URL-style "ports" work without any hardware:
+#
+#   replay://PATH[?speed=10&channel=0&loop=1]   replays a .tpcap/.csv recording
+#                                              (or any text log) in real time,
+#                                              N times faster, or speed=max
+#   sim://[?rate=10000&format=csv&noise=0.05&malformed=0.01&seed=1]
+#                                              deterministic synthetic sensor
+#
+# Every transport offers the part of the pyserial API that PortReader uses:
+# in_waiting, read(), fileno(), is_open and close(). The simulated ones have
+# no file descriptor, so SessionManager polls them.
+
+REPLAY_SCHEME = 'replay://'
+SYNTHETIC_SCHEME = 'sim://'
+# Upper bound for a single read from a simulated port
+MAX_CHUNK = 1 << 16
+
+
+def parse_url(url):
+    # 'scheme://target?key=value&...' -> (target, {key: value}); the target
+    # is kept verbatim so Windows paths need no escaping
+    rest = url.split('://', 1)[1]
+    target, _, query = rest.partition('?')
+    options = {}
+    for item in query.split('&'):
+        if item:
+            key, _, value = item.partition('=')
+            options[key] = value
+    return target, options
+
+
+def parse_speed(value):
+    if value in ('max', 'inf'):
+        return math.inf
+    speed = float(value)
+    if speed <= 0:
+        raise ValueError(f'Replay speed must be positive, got {value}')
+    return speed
+
+
+def open_transport(port, baudrate):
+    if port.startswith(REPLAY_SCHEME):
+        path, options = parse_url(port)
+        return ReplayTransport(path, baudrate, speed=parse_speed(options.pop('speed', '1')),
+                               channel=int(options.pop('channel', 0)),
+                               loop=options.pop('loop', '0') not in ('0', 'false', ''))
+    if port.startswith(SYNTHETIC_SCHEME):
+        _, options = parse_url(port)
+        kwargs = {}
+        for key, value in options.items():
+            if key not in SyntheticTransport.OPTIONS:
+                raise ValueError(f'Unknown sim:// option: {key!r}')
+            kwargs[key] = SyntheticTransport.OPTIONS[key](value)
+        return SyntheticTransport(**kwargs)
+    # Opened non-blocking; reads return whatever the driver has buffered
+    return serial.Serial(port=port, baudrate=baudrate, timeout=0)
+
+
+def port_identity(port):
+    # (vid, pid, serial number) of a USB serial adapter, or None for ports
+    # without USB ids (built-in UARTs, sim:// and replay://)
+    if '://' in port:
+        return None
+    for info in list_ports.comports():
+        if info.device == port and info.vid is not None:
+            return (info.vid, info.pid, info.serial_number)
+    return None
+
+
+def find_port(identity, preferred=None, exclude=()):
+    # Current device name of the adapter with this identity, which may have
+    # changed after it was unplugged (COM3 -> COM5, ttyACM0 -> ttyACM1).
+    # Ports in exclude (held by other readers) are never returned. Without
+    # a serial number, or with several matches, identical adapters cannot
+    # be told apart, so only the preferred (original) name is accepted.
+    matches = [info.device for info in list_ports.comports()
+               if info.vid is not None and (info.vid, info.pid, info.serial_number) == identity
+               and info.device not in exclude]
+    if preferred in matches:
+        return preferred
+    if identity[2] is None or len(matches) != 1:
+        return None
+    return matches[0]
+
+
+class SimulatedTransport:
+    # Buffer plumbing shared by the replay and synthetic transports:
+    # subclasses implement _generate(elapsed), returning the bytes that
+    # became due since the last call.
+    def __init__(self):
+        self._buffer = bytearray()
+        # Starts sending when first read, not when opened, so nothing is
+        # back-dated to before the I/O thread started reading
+        self._start = None
+        self._generated = 0
+        self.is_open = True
+
+    @property
+    def byte_ns(self):
+        # Average time per byte so far; PortReader back-dates lines with it
+        # instead of the baud rate, which a simulated port does not keep to
+        if self._start is None:
+            return 0.0
+        return (time.perf_counter() - self._start) * 1e9 / max(self._generated, 1)
+
+    def _fill(self):
+        if self._start is None:
+            self._start = time.perf_counter()
+        if len(self._buffer) < MAX_CHUNK:
+            data = self._generate(time.perf_counter() - self._start)
+            self._generated += len(data)
+            self._buffer += data
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            raise serial.SerialException('Port is closed')
+        self._fill()
+        return min(len(self._buffer), MAX_CHUNK)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise serial.SerialException('Port is closed')
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def fileno(self):
+        raise OSError('Simulated ports have no file descriptor')
+
+    def close(self):
+        self.is_open = False
+
+
+class ReplayTransport(SimulatedTransport):
+    # Replays a recording as the lines a sensor would have sent. Captures and
+    # CSV exports are re-timed from their Seconds column; any other file is
+    # treated as a raw log and trickled out at the wire rate of baudrate.
+    def __init__(self, path, baudrate=9600, speed=1.0, channel=0, loop=False):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self._byte_rate = baudrate / 10
+        self._times = None
+        self._values = None
+        self._raw = None
+        self._position = 0
+        self._offset = 0.0
+        with open(path, 'rb') as f:
+            head = f.read(len(MAGIC))
+        if head == MAGIC:
+            header, records = open_capture(path)
+            records = records[records['channel'] == channel]
+            # Captures hold calibrated values; replay what the sensor sent,
+            # using this channel's own offset (none if the file lacks it)
+            offset = header['channels'].get(channel, {}).get('calibration_offset', 0.0)
+            self._times = records['t']
+            self._values = records['value'] - offset
+        elif path.lower().endswith('.csv'):
+            self._times, self._values = self._read_csv(path, channel)
+        else:
+            with open(path, 'rb') as f:
+                self._raw = f.read()
+
+    @staticmethod
+    def _read_csv(path, channel):
+        times = []
+        values = []
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = csv.reader(f)
+            header = next(rows, [])
+            channel_column = header.index('Channel') if 'Channel' in header else None
+            for row in rows:
+                if channel_column is not None and int(row[channel_column]) != channel:
+                    continue
+                times.append(float(row[0]))
+                values.append(float(row[1]))
+        return np.array(times), np.array(values)
+
+    @property
+    def duration(self):
+        # Seconds of recording (at 1x) in one pass
+        if self._raw is not None:
+            return len(self._raw) / self._byte_rate
+        return float(self._times[-1]) if len(self._times) else 0.0
+
+    def _generate(self, elapsed):
+        position = elapsed * self.speed - self._offset
+        if self._raw is not None:
+            return self._generate_raw(position)
+        times = self._times
+        if self._position >= len(times):
+            if not self.loop or not len(times):
+                return b''
+            # Start over, one sample period after the last sample
+            period = self.duration / max(len(times) - 1, 1)
+            self._offset += self.duration + period
+            self._position = 0
+            position = elapsed * self.speed - self._offset
+        start = self._position
+        # Bounded batch so speed=max still hands over data in chunks
+        end = min(int(np.searchsorted(times, position, side='right')), start + MAX_CHUNK // 16)
+        if end <= start:
+            return b''
+        self._position = end
+        return b''.join(b'temp: %.2f\n' % value for value in self._values[start:end].tolist())
+
+    def _generate_raw(self, position):
+        raw = self._raw
+        if self._position >= len(raw):
+            if not self.loop or not raw:
+                return b''
+            self._offset += len(raw) / self._byte_rate
+            self._position = 0
+            position -= len(raw) / self._byte_rate
+        due = len(raw) if math.isinf(position) else int(position * self._byte_rate)
+        end = min(due, self._position + MAX_CHUNK, len(raw))
+        data = raw[self._position:end]
+        self._position = max(self._position, end)
+        return data
+
+
+# Line layouts the synthetic sensor can send, one per registered parser
+SYNTHETIC_FORMATS = {
+    'temp': lambda t, value: b'temp: %.2f\n' % value,
+    'csv': lambda t, value: b'%.2f,%.1f\n' % (value, 40.0 + value / 10),
+    'key=value': lambda t, value: b'hum=41.2 temp=%.2f\n' % value,
+    'millis,temp': lambda t, value: b'%d,%.2f\n' % (int(t * 1000), value),
+}
+
+MALFORMED_LINES = (
+    b'temp: --.-\n',
+    b'\xff\xfe\x00garbage\n',
+    b'temp: 99999.00\n',
+    b'ERR sensor timeout\n',
+    b'Temp',
+    b'\n',
+)
+
+
+class SyntheticTransport(SimulatedTransport):
+    # A sensor that sends rate lines per second of a slow sine wave plus
+    # Gaussian noise. Line n always has the same contents for a given seed,
+    # whatever the polling pattern, so load tests are reproducible; a
+    # fraction of the lines (malformed) is replaced by junk the parser must
+    # reject.
+    OPTIONS = {
+        'rate': float,
+        'format': str,
+        'base': float,
+        'amplitude': float,
+        'period': float,
+        'noise': float,
+        'malformed': float,
+        'seed': int,
+    }
+
+    def __init__(self, rate=10.0, format='temp', base=22.0, amplitude=2.0, period=60.0,
+                 noise=0.05, malformed=0.0, seed=0):
+        super().__init__()
+        if rate <= 0:
+            raise ValueError(f'Synthetic rate must be positive, got {rate}')
+        if format not in SYNTHETIC_FORMATS:
+            raise ValueError(f'Unknown synthetic format: {format!r} (known: {", ".join(sorted(SYNTHETIC_FORMATS))})')
+        self.rate = rate
+        self.format = format
+        self.base = base
+        self.amplitude = amplitude
+        self.period = period
+        self.noise = noise
+        self.malformed = malformed
+        self._encode = SYNTHETIC_FORMATS[format]
+        # Name of the temp_parser parser for these lines; picked up by PortReader
+        self.parser = format
+        self._rng = random.Random(seed)
+        self.lines_sent = 0
+
+    def lines(self, count):
+        # The next count lines, advancing the generator
+        encode = self._encode
+        rng = self._rng
+        gauss = rng.gauss
+        w = 2 * math.pi / self.period
+        out = []
+        n = self.lines_sent
+        for n in range(n, n + count):
+            t = n / self.rate
+            if self.malformed and rng.random() < self.malformed:
+                out.append(MALFORMED_LINES[n % len(MALFORMED_LINES)])
+                continue
+            value = self.base + self.amplitude * math.sin(w * t)
+            if self.noise:
+                value += gauss(0.0, self.noise)
+            out.append(encode(t, value))
+        self.lines_sent += count
+        return b''.join(out)
+
+    def _generate(self, elapsed):
+        due = int(elapsed * self.rate) + 1 - self.lines_sent
+        # Bounded batch after a stall; the rest follows on the next read
+        return self.lines(min(due, MAX_CHUNK // 16)) if due > 0 else b''